@@ -0,0 +1,316 @@
+"""
+Benchmark of the degrees implementations on synthetic datasets.
+
+For each size, a dataset with about that many star edges is generated
+(see generate.py) and cached under --data. Every implementation then
+runs in its own subprocess, since degrees_1 and degrees_2 are both
+imported as `degrees`, and reports load time, peak memory, the mean
+cost of neighbors_for_person and per-query shortest_path latency on the
+same random pairs of people.
+
+Each query gets a time budget, enforced with SIGALRM where available:
+degrees_1 extends every partial path and blows up on large graphs. An
+implementation that times out on a few queries in a row skips the rest.
+Path lengths are checked against those of degrees_2-csr.
+
+Results are printed as a table and written as JSON lines, one record per
+(size, implementation), for regression tracking.
+
+Usage: python benchmark.py [--sizes N ...] [--queries Q] [--budget SECONDS]
+                           [--implementations NAME ...] [--output file]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from generate import generate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5]
+
+# name -> (folder, load_data keyword arguments, shortest_path keyword arguments)
+IMPLEMENTATIONS = {
+    "degrees_1": ("degrees_1", {}, {}),
+    "degrees_2": ("degrees_2", {"backend": "dict"}, {}),
+    "degrees_2-bidirectional": ("degrees_2", {"backend": "dict"}, {"bidirectional": True}),
+    "degrees_2-csr": ("degrees_2", {"backend": "csr", "cache": False}, {}),
+    "degrees_2-csr-bidirectional": (
+        "degrees_2", {"backend": "csr", "cache": False}, {"bidirectional": True}
+    ),
+}
+
+# Paths are checked against this implementation's lengths
+REFERENCE = "degrees_2-csr"
+
+# Consecutive timeouts after which an implementation skips its remaining queries
+MAX_TIMEOUTS = 3
+
+# People whose neighbors are timed per implementation
+NEIGHBOR_SAMPLE = 1000
+
+
+class Timeout(Exception):
+    pass
+
+
+def peak_memory():
+    """
+    Returns the peak resident set size of this process in bytes, or None.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of sorted `values` (nearest rank).
+    """
+    if not values:
+        return None
+    return values[max(0, -(-p * len(values) // 100) - 1)]
+
+
+def dataset(data, edges, seed):
+    """
+    Returns the directory of the dataset with about `edges` edges,
+    generating it and its query pairs if needed.
+    """
+    directory = os.path.join(data, f"edges-{edges}-seed-{seed}")
+    if not os.path.exists(os.path.join(directory, "queries.csv")):
+        generate(directory, edges, seed)
+        with open(os.path.join(directory, "people.csv"), encoding="utf-8") as f:
+            person_ids = [row[0] for row in csv.reader(f)][1:]
+        rng = random.Random(seed)
+        with open(os.path.join(directory, "queries.csv"), "w",
+                  encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            for _ in range(1000):
+                writer.writerow([rng.choice(person_ids), rng.choice(person_ids)])
+    return directory
+
+
+def count_rows(directory, name):
+    with open(os.path.join(directory, name), encoding="utf-8") as f:
+        return sum(1 for _ in f) - 1
+
+
+def worker(name, directory, queries, budget):
+    """
+    Benchmarks one implementation in this process and prints a JSON
+    record of its measurements.
+    """
+    folder, load_options, search_options = IMPLEMENTATIONS[name]
+    sys.path.insert(0, os.path.join(HERE, folder))
+    import degrees
+
+    with open(os.path.join(directory, "queries.csv"), encoding="utf-8") as f:
+        pairs = [tuple(row) for row in csv.reader(f)][:queries]
+
+    baseline = peak_memory()
+    start = time.perf_counter()
+    degrees.load_data(directory, **load_options)
+    load_seconds = time.perf_counter() - start
+    peak = peak_memory()
+
+    sample = [source for source, _ in pairs]
+    sample = (sample * (NEIGHBOR_SAMPLE // len(sample) + 1))[:NEIGHBOR_SAMPLE]
+    start = time.perf_counter()
+    for person_id in sample:
+        degrees.neighbors_for_person(person_id)
+    neighbors_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    def expire(signum, frame):
+        raise Timeout()
+
+    alarm = hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, expire)
+
+    # Per query: path length, None when not connected, "timeout" or "skipped"
+    lengths = []
+    latencies = []
+    timeouts = 0
+    for source, target in pairs:
+        if timeouts >= MAX_TIMEOUTS:
+            lengths.append("skipped")
+            continue
+        start = time.perf_counter()
+        try:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, budget)
+            path = degrees.shortest_path(source, target, **search_options)
+        except Timeout:
+            lengths.append("timeout")
+            timeouts += 1
+            continue
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        latencies.append(time.perf_counter() - start)
+        lengths.append(None if path is None else len(path))
+        timeouts = 0
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "peak_rss_bytes": peak,
+        "load_rss_bytes": None if peak is None else peak - baseline,
+        "neighbors_us": neighbors_us,
+        "latencies": latencies,
+        "lengths": lengths,
+    }))
+
+
+def run(name, directory, queries, budget):
+    """
+    Runs the worker for implementation `name` in a subprocess and
+    returns its record, or one with an "error" if it failed.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--worker", name,
+               "--directory", directory, "--queries", str(queries),
+               "--budget", str(budget)]
+    # Loading plus every query at its full budget, with room to spare
+    limit = 600 + queries * budget * 2
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=limit)
+    except subprocess.TimeoutExpired:
+        return {"error": f"no result after {limit:.0f}s"}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(record, reference):
+    """
+    Replaces the raw latencies and lengths of a worker record with
+    latency percentiles and counts, comparing lengths to `reference`.
+    """
+    latencies = sorted(record.pop("latencies"))
+    lengths = record.pop("lengths")
+    record["completed"] = len(latencies)
+    record["timeouts"] = lengths.count("timeout")
+    record["skipped"] = lengths.count("skipped")
+    record["query_ms"] = {
+        "mean": sum(latencies) / len(latencies) * 1000 if latencies else None,
+        "p50": None if not latencies else percentile(latencies, 50) * 1000,
+        "p90": None if not latencies else percentile(latencies, 90) * 1000,
+        "max": None if not latencies else latencies[-1] * 1000,
+    }
+    record["mismatches"] = None
+    if reference is not None:
+        record["mismatches"] = sum(
+            1 for a, b in zip(lengths, reference)
+            if a not in ("timeout", "skipped") and b not in ("timeout", "skipped")
+            and a != b
+        )
+    return record
+
+
+def revision():
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                   capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def print_row(record):
+    def number(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    if "error" in record:
+        print(f"{record['edges']:>9} {record['implementation']:<28} error: {record['error']}",
+              file=sys.stderr)
+        return
+    query = record["query_ms"]
+    memory = record["load_rss_bytes"]
+    print(f"{record['edges']:>9} {record['implementation']:<28}"
+          f" {record['load_seconds']:>8.2f}"
+          f" {number(memory and memory / 2 ** 20, '.1f'):>8}"
+          f" {record['neighbors_us']:>9.1f}"
+          f" {number(query['p50'], '.2f'):>9} {number(query['p90'], '.2f'):>9}"
+          f" {record['completed']:>4}/{record['queries']:<4}"
+          f" {number(record['mismatches'], 'd'):>4}",
+          file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [--sizes N ...] [--queries Q] [--budget SECONDS]"
+              " [--implementations NAME ...] [--output file]"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="approximate star edges per dataset")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=5.0,
+                        help="seconds allowed per shortest_path query")
+    parser.add_argument("--implementations", nargs="+", choices=list(IMPLEMENTATIONS),
+                        default=list(IMPLEMENTATIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default=os.path.join(HERE, "benchmark_data"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--output", default="-",
+                        help="JSON lines results (default: stdout)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.directory, args.queries, args.budget)
+        return
+
+    names = list(args.implementations)
+    # Run the reference first, so the others can be checked against it
+    if REFERENCE in names:
+        names.remove(REFERENCE)
+        names.insert(0, REFERENCE)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    print(f"{'edges':>9} {'implementation':<28} {'load (s)':>8} {'mem MiB':>8}"
+          f" {'nbrs (us)':>9} {'p50 (ms)':>9} {'p90 (ms)':>9} {'done':>9} {'diff':>4}",
+          file=sys.stderr)
+    commit = revision()
+    try:
+        for edges in args.sizes:
+            directory = dataset(args.data, edges, args.seed)
+            sizes = {
+                "people": count_rows(directory, "people.csv"),
+                "movies": count_rows(directory, "movies.csv"),
+                "stars": count_rows(directory, "stars.csv"),
+            }
+            reference = None
+            for name in names:
+                record = {"edges": edges, **sizes, "implementation": name,
+                          "queries": args.queries, "budget": args.budget,
+                          "revision": commit, "python": sys.version.split()[0]}
+                result = run(name, directory, args.queries, args.budget)
+                if "error" in result:
+                    record["error"] = result["error"]
+                else:
+                    lengths = list(result["lengths"])
+                    record.update(summarize(result, reference))
+                    if name == REFERENCE:
+                        reference = lengths
+                print_row(record)
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
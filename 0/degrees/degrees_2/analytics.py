@@ -0,0 +1,299 @@
+"""
+Network statistics for the degrees co-star graph.
+
+Runs breadth-first searches from every person, or from a random sample
+of them, and reports the distribution of separation lengths, each
+source's eccentricity (its largest finite separation) and the "center"
+of the graph (the people in the largest connected component with the
+smallest eccentricity).
+
+Searches run in batches of up to `width` sources at once, bit-parallel:
+every person carries an int whose bit i says "reached by source i", so
+one sweep over the edges advances all sources of a batch by a level.
+Per-source counts are kept as bit-sliced counters over the same ints.
+
+With --sample, fractions and the mean separation are estimated from the
+sampled sources and reported with 95% confidence intervals.
+
+Usage: python analytics.py [directory] [--sample K] [--width W] [--seed S]
+                           [--eccentricities file]
+"""
+
+import argparse
+import csv
+import math
+import random
+import sys
+
+import degrees
+from graph import Graph
+
+# z-score for a two-sided 95% confidence interval
+Z95 = 1.96
+
+
+class SourceStats():
+    """
+    Separation statistics for one BFS source.
+    """
+
+    def __init__(self, person):
+        self.person = person
+        # counts[d] = number of people at separation d (d >= 1)
+        self.counts = {}
+        self.eccentricity = 0
+
+    def reached(self):
+        return sum(self.counts.values())
+
+    def total_distance(self):
+        return sum(d * c for d, c in self.counts.items())
+
+    def mean_distance(self):
+        reached = self.reached()
+        return self.total_distance() / reached if reached else None
+
+
+def current_graph():
+    """
+    Returns the loaded graph, building a compact one from the `people`
+    and `movies` maps of degrees.py if the dict backend was used.
+    """
+    if degrees.graph is not None:
+        return degrees.graph
+    return Graph.from_dicts(degrees.people, degrees.movies)
+
+
+def multi_source_bfs(graph, sources):
+    """
+    Runs a bit-parallel BFS from every person index in `sources` and
+    returns a SourceStats per source, in the same order.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    stats = [SourceStats(s) for s in sources]
+    seen = [0] * graph.num_people()
+    frontier = {}
+    for i, s in enumerate(sources):
+        seen[s] |= 1 << i
+        frontier[s] = frontier.get(s, 0) | (1 << i)
+
+    depth = 0
+    while frontier:
+        depth += 1
+
+        # Person -> movie half step: which sources reach each movie
+        movie_bits = {}
+        for p, bits in frontier.items():
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                movie_bits[m] = movie_bits.get(m, 0) | bits
+
+        # Movie -> person half step: keep only first visits
+        next_frontier = {}
+        for m, bits in movie_bits.items():
+            for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                q = movie_stars[j]
+                new = bits & ~seen[q]
+                if new:
+                    seen[q] |= new
+                    next_frontier[q] = next_frontier.get(q, 0) | new
+
+        # Count, per source, how many people were reached at this depth
+        counters = []
+        active = 0
+        for new in next_frontier.values():
+            active |= new
+            add_to_counters(counters, new)
+        if active:
+            for i, count in enumerate(read_counters(counters, len(sources))):
+                if count:
+                    stats[i].counts[depth] = count
+                    stats[i].eccentricity = depth
+
+        frontier = next_frontier
+
+    return stats
+
+
+def add_to_counters(counters, bits):
+    """
+    Adds 1 to the count of every source whose bit is set in `bits`.
+    counters[j] holds bit j of every source's count.
+    """
+    carry = bits
+    for j in range(len(counters)):
+        if not carry:
+            return
+        overflow = counters[j] & carry
+        counters[j] ^= carry
+        carry = overflow
+    if carry:
+        counters.append(carry)
+
+
+def read_counters(counters, width):
+    """
+    Returns the per-source counts held in bit-sliced `counters`.
+    """
+    counts = [0] * width
+    for j, bits in enumerate(counters):
+        while bits:
+            low = bits & -bits
+            counts[low.bit_length() - 1] += 1 << j
+            bits ^= low
+    return counts
+
+
+def sweep(graph, sources, width=256):
+    """
+    Runs BFS from all `sources` in batches of `width` and returns their
+    SourceStats.
+    """
+    stats = []
+    for start in range(0, len(sources), width):
+        stats.extend(multi_source_bfs(graph, sources[start:start + width]))
+    return stats
+
+
+def summarize(stats, population):
+    """
+    Returns a dict of aggregate statistics over per-source `stats`,
+    sampled from `population` people. Confidence intervals are zero
+    when every person was a source.
+    """
+    connected = [s for s in stats if s.reached()]
+    k = len(connected)
+    # Finite population correction for sampling without replacement
+    correction = math.sqrt(max(0.0, 1 - len(stats) / population)) if population > 1 else 0.0
+
+    depths = sorted({d for s in connected for d in s.counts})
+    distribution = []
+    for d in depths:
+        total = sum(s.counts.get(d, 0) for s in connected)
+        fractions = [s.counts.get(d, 0) / s.reached() for s in connected]
+        mean, margin = estimate(fractions, correction)
+        distribution.append({"degrees": d, "pairs": total,
+                             "fraction": mean, "margin": margin})
+
+    mean_distance, margin = estimate(
+        [s.mean_distance() for s in connected], correction
+    )
+
+    # Eccentricity only makes sense within one component; tiny isolated
+    # casts would otherwise all look central, so use the largest one
+    largest = max((s.reached() for s in connected), default=0)
+    central = [s for s in connected if s.reached() == largest]
+    center = min((s.eccentricity for s in central), default=None)
+    return {
+        "sources": len(stats),
+        "connected_sources": k,
+        "population": population,
+        "distribution": distribution,
+        "mean_degrees": mean_distance,
+        "mean_degrees_margin": margin,
+        "max_eccentricity": max((s.eccentricity for s in connected), default=None),
+        "center_eccentricity": center,
+        "center": sorted(
+            (s for s in central if s.eccentricity == center),
+            key=lambda s: s.mean_distance(),
+        ),
+    }
+
+
+def estimate(values, correction):
+    """
+    Returns (mean, 95% margin of error) of a sample of per-source values.
+    """
+    if not values:
+        return None, None
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, None
+    variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    return mean, Z95 * math.sqrt(variance / len(values)) * correction
+
+
+def write_eccentricities(graph, stats, filename):
+    """
+    Writes person_id, name, eccentricity, reached, mean degrees per source.
+    """
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "name", "eccentricity", "reached", "mean_degrees"])
+        for s in stats:
+            mean = s.mean_distance()
+            writer.writerow([
+                graph.person_ids[s.person],
+                graph.person_names[s.person],
+                s.eccentricity,
+                s.reached(),
+                "" if mean is None else f"{mean:.4f}",
+            ])
+
+
+def print_summary(graph, summary, top=10):
+    sampled = summary["sources"] < summary["population"]
+    print(f"Sources: {summary['sources']} of {summary['population']} people"
+          f" ({summary['connected_sources']} with co-stars)")
+    if summary["mean_degrees"] is None:
+        print("No connected sources.")
+        return
+
+    print("Degrees  Pairs         Fraction")
+    for row in summary["distribution"]:
+        line = f"{row['degrees']:>7}  {row['pairs']:>12}  {row['fraction']:.4f}"
+        if sampled and row["margin"] is not None:
+            line += f" ± {row['margin']:.4f}"
+        print(line)
+
+    line = f"Mean degrees of separation: {summary['mean_degrees']:.4f}"
+    if sampled and summary["mean_degrees_margin"] is not None:
+        line += f" ± {summary['mean_degrees_margin']:.4f}"
+    print(line)
+    label = "Largest eccentricity seen" if sampled else "Diameter"
+    print(f"{label}: {summary['max_eccentricity']}")
+    print(f"Center eccentricity, largest component"
+          f"{' (among sources)' if sampled else ''}: {summary['center_eccentricity']}")
+    for s in summary["center"][:top]:
+        print(f"  {graph.person_names[s.person]} ({graph.person_ids[s.person]}),"
+              f" mean degrees {s.mean_distance():.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python analytics.py [directory] [--sample K] [--width W]"
+              " [--seed S] [--eccentricities file]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--sample", type=int,
+                        help="number of random sources (default: everyone)")
+    parser.add_argument("--width", type=int, default=256,
+                        help="sources searched together per batch")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--eccentricities",
+                        help="CSV file for per-source statistics")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or write the csr snapshot")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, "csr", not args.no_cache)
+    graph = current_graph()
+    population = graph.num_people()
+
+    sources = list(range(population))
+    if args.sample is not None and args.sample < population:
+        sources = random.Random(args.seed).sample(sources, args.sample)
+
+    stats = sweep(graph, sources, args.width)
+    print_summary(graph, summarize(stats, population))
+    if args.eccentricities:
+        write_eccentricities(graph, stats, args.eccentricities)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Batch separation queries for the degrees dataset.
+
+Reads (source, target) pairs, one per line as CSV, from a file or stdin.
+People may be given by IMDb id or by an unambiguous name. Queries are
+grouped by source so that one breadth-first search tree per source
+answers all of its targets, and results are written in input order.
+
+With --workers N the source groups are fanned out over N processes.
+Workers are forked after the graph is loaded, so they share it
+copy-on-write (or through the mmap'd snapshot) instead of receiving a
+pickled copy; only group ids and result paths cross process boundaries.
+
+Usage: python batch.py [directory] [pairs] [--format csv|jsonl] [--output file]
+                       [--workers N]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from graph import trace
+
+
+def read_pairs(f):
+    """
+    Returns (source, target) pairs from CSV lines, skipping blank lines
+    and an optional "source,target" header.
+    """
+    pairs = []
+    for row in csv.reader(f):
+        if not row or not "".join(row).strip():
+            continue
+        if len(row) != 2:
+            raise ValueError(f"expected source,target, got {row!r}")
+        source, target = row[0].strip(), row[1].strip()
+        if not pairs and (source, target) == ("source", "target"):
+            continue
+        pairs.append((source, target))
+    return pairs
+
+
+def resolve(graph, person):
+    """
+    Returns the person index for an IMDb id or unambiguous name,
+    or None.
+    """
+    index = graph.person_index.get(person)
+    if index is not None:
+        return index
+    person_ids = graph.ids_for_name(person)
+    if len(person_ids) == 1:
+        return graph.person_index[person_ids[0]]
+    return None
+
+
+def answer(graph, s, targets):
+    """
+    Returns {target index: path} for all targets of source index `s`,
+    using a single search tree. Paths are lists of (movie index,
+    person index) pairs, or None when not connected.
+    """
+    parent, via = graph.tree(s, targets)
+    return {
+        t: trace(parent, via, s, t) if parent[t] != -1 else None
+        for t in targets
+    }
+
+
+def group_by_source(queries):
+    """
+    Returns {source index: [target index, ...]} for resolved queries.
+    """
+    # Targets are dict keys, so duplicates are dropped in constant time
+    # and the first-seen order is kept
+    groups = {}
+    for s, t in queries:
+        if s is None or t is None:
+            continue
+        groups.setdefault(s, {})[t] = None
+    return {s: list(targets) for s, targets in groups.items()}
+
+
+def answer_group(group):
+    """
+    Worker entry point: answers one (source, targets) group against the
+    graph already loaded in this process.
+    """
+    s, targets = group
+    return answer(degrees.graph, s, targets)
+
+
+def init_worker(directory, cache):
+    """
+    Loads the graph in a worker that could not inherit it by forking.
+    """
+    degrees.load_data(directory, "csr", cache)
+
+
+def run(graph, pairs, workers=1, directory=None, cache=True):
+    """
+    Yields one result dict per input pair, in input order, as soon as
+    every query up to it has been answered.
+
+    With more than one worker, source groups are answered in a process
+    pool. `graph` must then be `degrees.graph`; `directory` and `cache`
+    are only used on platforms without fork, where each worker loads the
+    graph itself.
+    """
+    queries = [(resolve(graph, source), resolve(graph, target))
+               for source, target in pairs]
+    groups = list(group_by_source(queries).items())
+    # Index of the group each source belongs to; groups are in order of
+    # first appearance, so queries can be released as groups complete
+    group_number = {s: i for i, (s, _) in enumerate(groups)}
+
+    if workers > 1 and groups:
+        if "fork" in multiprocessing.get_all_start_methods():
+            executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("fork")
+            )
+        else:
+            executor = ProcessPoolExecutor(
+                workers, initializer=init_worker, initargs=(directory, cache)
+            )
+        chunksize = max(1, len(groups) // (workers * 8))
+        answers = executor.map(answer_group, groups, chunksize=chunksize)
+    else:
+        executor = None
+        answers = (answer(graph, s, targets) for s, targets in groups)
+
+    try:
+        paths = {}
+        done = 0
+        next_query = 0
+        for (s, _), group_paths in zip(groups, answers):
+            for t, path in group_paths.items():
+                paths[(s, t)] = path
+            done += 1
+            while next_query < len(queries):
+                s, t = queries[next_query]
+                if s is not None and t is not None and group_number[s] >= done:
+                    break
+                source, target = pairs[next_query]
+                yield result(graph, source, target, s, t, paths.get((s, t)))
+                next_query += 1
+
+        for (source, target), (s, t) in zip(pairs[next_query:], queries[next_query:]):
+            yield result(graph, source, target, s, t, paths.get((s, t)))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def result(graph, source, target, s, t, path):
+    """
+    Returns the output record for one query.
+    """
+    record = {"source": source, "target": target, "degrees": None,
+              "path": None, "error": None}
+    if s is None or t is None:
+        missing = source if s is None else target
+        record["error"] = f"person not found or ambiguous: {missing}"
+    elif path is not None:
+        record["degrees"] = len(path)
+        record["path"] = [
+            [graph.movie_ids[m], graph.person_ids[p]] for m, p in path
+        ]
+    return record
+
+
+def write_results(records, f, output_format):
+    """
+    Writes result records as CSV or JSON lines. In CSV, the path is a
+    space-separated list of movie_id/person_id steps.
+    """
+    if output_format == "jsonl":
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        return
+
+    writer = csv.writer(f)
+    writer.writerow(["source", "target", "degrees", "path", "error"])
+    for record in records:
+        path = record["path"]
+        writer.writerow([
+            record["source"],
+            record["target"],
+            "" if record["degrees"] is None else record["degrees"],
+            "" if path is None else " ".join(f"{m}/{p}" for m, p in path),
+            record["error"] or "",
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py [directory] [pairs] [--format csv|jsonl]"
+              " [--output file] [--workers N]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("pairs", nargs="?", default="-",
+                        help="CSV of source,target pairs (default: stdin)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--output", default="-",
+                        help="where to write results (default: stdout)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or write the csr snapshot")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.pairs == "-":
+        pairs = read_pairs(sys.stdin)
+    else:
+        with open(args.pairs, encoding="utf-8", newline="") as f:
+            pairs = read_pairs(f)
+
+    degrees.load_data(args.directory, "csr", not args.no_cache)
+    records = run(degrees.graph, pairs, args.workers, args.directory,
+                  not args.no_cache)
+
+    if args.output == "-":
+        write_results(records, sys.stdout, args.format)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write_results(records, f, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark of the list-backed frontiers against the deque-backed ones.
+
+Each run adds n nodes, does a batch of contains_state lookups and then
+drains the frontier, which is the access pattern of a BFS.
+
+Usage: python benchmark_frontiers.py [n ...]
+"""
+
+import sys
+import time
+
+from util import (
+    Node, StackFrontier, QueueFrontier, DequeStackFrontier, DequeQueueFrontier
+)
+
+SIZES = [10 ** 5, 10 ** 6]
+
+# Lookups per run; the list frontiers scan the whole frontier for each one
+LOOKUPS = 100
+
+# The list frontiers copy the whole list on every remove, so they are
+# quadratic; past this size they would run for hours and are skipped.
+OLD_LIMIT = 10 ** 5
+
+
+def run(frontier_class, n):
+    """
+    Returns seconds spent adding, looking up and removing n nodes.
+    """
+    nodes = [Node(i, None, None) for i in range(n)]
+    step = max(1, n // LOOKUPS)
+
+    start = time.perf_counter()
+    frontier = frontier_class()
+    for node in nodes:
+        frontier.add(node)
+    for state in range(0, n, step):
+        frontier.contains_state(state)
+    while not frontier.empty():
+        frontier.remove()
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    pairs = [
+        ("stack", StackFrontier, DequeStackFrontier),
+        ("queue", QueueFrontier, DequeQueueFrontier),
+    ]
+    print(f"{'kind':<6} {'n':>9} {'old (s)':>10} {'new (s)':>10} {'speedup':>9}")
+    for n in sizes:
+        for kind, old_class, new_class in pairs:
+            new = run(new_class, n)
+            if n > OLD_LIMIT:
+                print(f"{kind:<6} {n:>9} {'skipped':>10} {new:>10.3f} {'-':>9}")
+                continue
+            old = run(old_class, n)
+            print(f"{kind:<6} {n:>9} {old:>10.3f} {new:>10.3f} {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
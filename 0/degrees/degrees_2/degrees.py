@@ -1,7 +1,18 @@
-import csv
+import argparse
+import heapq
+import math
 import sys
+import time
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+import updates
+from graph import Graph
+from filters import MovieFilter
+from landmarks import LandmarkIndex
+from loader import LoadStats, read_chunks
+from nameindex import NameIndex
+from util import Node, DequeQueueFrontier, SearchStats
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,74 +23,151 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Fuzzy/prefix name index over `people` for the dict backend, and the
+# person_ids its person indices refer to (the csr graph has its own)
+name_index = None
+name_index_ids = []
 
-def load_data(directory):
+# Compact integer-indexed graph, used instead of `people`/`movies`
+# when the data is loaded with backend="csr"
+graph = None
+
+# Movies left out of searches by the active MovieFilter: a bytearray over
+# movie indices for `graph`, a set of movie_ids for the dict backend, or
+# None when unfiltered
+blocked_movies = None
+# The MovieFilter behind blocked_movies, reapplied after updates
+active_filter = None
+
+# Optional landmark distance index over `graph`, used to bound
+# separations and to rule out unconnected pairs before searching
+landmark_index = None
+# Landmark count of an index dropped by apply_delta: searches skip the
+# connectivity check until distance_bounds or rebuild_landmarks builds
+# it again
+stale_landmarks = None
+
+
+def load_data(directory, backend="dict", cache=True, stats=None, updated=False):
     """
     Load data from CSV files into memory.
+
+    With backend="csr" the data is loaded into `graph` instead of the
+    `names`, `people` and `movies` dictionaries. Unless `cache` is False,
+    the graph is memory-mapped from a binary snapshot next to the CSVs,
+    which is (re)written whenever the CSVs change. With `updated`, a
+    snapshot that apply_delta saved for the current CSVs is used first.
+
+    The CSVs are streamed in chunks and may be gzip-compressed. If a
+    loader.LoadStats is passed as `stats`, rows/sec and peak memory are
+    recorded in it.
     """
+    global graph, name_index, name_index_ids
+    if backend == "csr":
+        if cache:
+            graph = snapshot.load_graph(directory, stats, updated)
+        else:
+            graph = Graph.from_csv(directory, stats)
+        return
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
+    for chunk in read_chunks(directory, "people.csv", stats=stats):
+        for person_id, name, birth in chunk:
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            if name.lower() not in names:
+                names[name.lower()] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
+                names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
+    for chunk in read_chunks(directory, "movies.csv", stats=stats):
+        for movie_id, title, year in chunk:
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
                 "stars": set()
             }
 
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    # Load stars, skipping rows for unknown people or movies
+    for chunk in read_chunks(directory, "stars.csv", stats=stats):
+        for person_id, movie_id in chunk:
+            if person_id in people and movie_id in movies:
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
+            elif stats is not None:
+                stats.skipped += 1
+
+    # Index names for suggestions
+    name_index_ids = list(people)
+    name_index = NameIndex.build([people[i]["name"] for i in name_index_ids])
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(usage="python degrees.py [directory]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--backend", choices=["dict", "csr"], default="dict",
+                        help="in-memory representation of the graph")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or write the csr snapshot")
+    parser.add_argument("--updated", action="store_true",
+                        help="load the csr snapshot saved after applying deltas")
+    parser.add_argument("--landmarks", type=int, metavar="K",
+                        help="load K landmarks to skip searches between unconnected"
+                             " people (csr backend)")
+    parser.add_argument("--load-stats", action="store_true",
+                        help="report rows/sec and peak memory of the load")
+    parser.add_argument("--min-year", type=int,
+                        help="only use movies from this year on")
+    parser.add_argument("--max-year", type=int,
+                        help="only use movies up to this year")
+    parser.add_argument("--max-stars", type=int,
+                        help="skip movies with more stars than this")
+    parser.add_argument("--stats", action="store_true",
+                        help="report search statistics")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    stats = LoadStats() if args.load_stats else None
+    load_data(args.directory, args.backend, not args.no_cache, stats, args.updated)
+    if stats is not None:
+        print(stats.report())
+    if args.landmarks:
+        if graph is None:
+            sys.exit("--landmarks needs --backend csr")
+        load_landmarks(args.directory, args.landmarks)
+    set_movie_filter(MovieFilter(args.min_year, args.max_year, args.max_stars))
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    name = input("Name: ")
+    source = person_id_for_name(name)
     # source = person_id_for_name('Ian McKellen')
     # 1 DEGREE:
     # source = "129" 
     # 2 DEGREE:
-    source = "398"
+    # source = "398"
     if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+        not_found(name)
+    name = input("Name: ")
+    target = person_id_for_name(name)
     # target = person_id_for_name('Kevin Bacon')
     # 1 DEGREE:
     # target = "193"
     # 2 DEGREE:
     # target= "102"
     if target is None:
-        sys.exit("Person not found.")
+        not_found(name)
 
-    path = shortest_path(source, target)
+    stats = SearchStats() if args.stats else None
+    path = shortest_path(source, target, args.bidirectional, stats)
+    if stats is not None:
+        print(stats.report())
 
     if path is None:
         print("Not connected.")
@@ -89,99 +177,430 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
+            person1 = person_name(path[i][1])
             print(person1)
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person2 = person_name(path[i + 1][1])
+            movie = movie_title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 # MAIN
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    With `bidirectional=True` the search grows from both ends
+    (see `bidirectional_path`). If a util.SearchStats is passed as
+    `stats`, the search's counters and time are added to it.
+    """
+    if stats is None:
+        return search(source, target, bidirectional)
+    start = time.perf_counter()
+    path = search(source, target, bidirectional, stats)
+    stats.seconds += time.perf_counter() - start
+    stats.queries += 1
+    return path
+
+
+def search(source, target, bidirectional=False, stats=None):
+    """
+    Runs the shortest path search for the loaded backend.
     """
+    if graph is not None:
+        if landmark_index is not None:
+            # Filters only lengthen paths, so unconnected stays unconnected
+            lower, _ = landmark_index.bounds_for(source, target)
+            if lower == math.inf:
+                return None
+        return graph.shortest_path(source, target, bidirectional, blocked_movies, stats)
 
-    # TODO
+    if bidirectional:
+        return bidirectional_path(source, target, stats)
 
     if source == target:
         return []
-    
+
     def create_path(node):
         path = []
-        nod = node
-        while nod:
-            path = [(nod.action, nod.state)] + path
-            nod = nod.parent
+        while node.parent is not None:
+            path.append((node.action, node.state))
+            node = node.parent
+        path.reverse()
         return path
 
-    neighbors = neighbors_for_person(source)
-    # stack = StackFrontier()
-    stack = QueueFrontier()
-    for n in neighbors:
-        
-        new_node = Node(n[1], None, n[0])
-        state = new_node.state
-        if state == target:
-            return create_path(new_node)
-        if not stack.contains_state(state):  
-            stack.add(new_node)
-    
-    def create_stack():
-        nonlocal stack
-        print(len(stack.frontier), "💫💫length stack before")
-        n = stack.remove()
-        print(len(stack.frontier), "💫💫length stack after")
-
-        actor_state = n.state
-        if actor_state == target:
-            return create_path(n)
-        neighbors = neighbors_for_person(actor_state)
-        for nei in neighbors:
-            new_node = Node(nei[1], n, nei[0])
-            state = new_node.state                
-            if state == target:
-                return create_path(new_node)
-            if stack.contains_state(state) or stack.contains_state(actor_state): 
+    frontier = DequeQueueFrontier()
+    frontier.add(Node(source, None, None))
+
+    while not frontier.empty():
+        node = frontier.remove()
+        if stats is not None:
+            stats.nodes_expanded += 1
+            stats.neighbor_calls += 1
+        for movie_id, person_id in neighbors_for_person(node.state):
+            if frontier.seen(person_id):
+                if stats is not None:
+                    stats.duplicates += 1
                 continue
-            else:
-                person = False
-                nod = new_node
-                while nod.parent:
-                    nod = nod.parent
-                    if nod.state == state:  
-                        person = True 
-                        break  
-                if not person:
-                    stack.add(new_node)
-                else:
+            child = Node(person_id, node, movie_id)
+            if person_id == target:
+                return create_path(child)
+            frontier.add(child)
+        if stats is not None:
+            stats.frontier(len(frontier))
+
+    return None
+
+
+def bidirectional_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both
+    ends at once.
+
+    Each step expands one whole BFS level of the smaller frontier,
+    so hubs on one side don't blow up the search. Returns None if
+    the two people are not connected. Counters go to `stats` if given.
+    """
+    if source == target:
+        return []
+
+    # person_id -> (movie_id, person_id one step closer to that side's root)
+    forward = {source: None}
+    backward = {target: None}
+    # person_id -> number of steps from that side's root
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, forward_depth, backward_depth, stats
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, backward_depth, forward_depth, stats
+            )
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    return None
+
+
+def expand_level(frontier, parents, depth, other_depth, stats=None):
+    """
+    Expands every person in `frontier` by one step, recording parents
+    and depths for newly reached people.
+
+    Returns the next frontier and the reached person that lies on the
+    shortest source-target path through this level, or None.
+    """
+    next_frontier = []
+    meeting = None
+    best = None
+    if stats is not None:
+        stats.nodes_expanded += len(frontier)
+        stats.neighbor_calls += len(frontier)
+    for person_id in frontier:
+        next_depth = depth[person_id] + 1
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor in parents:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            depth[neighbor] = next_depth
+            next_frontier.append(neighbor)
+            if neighbor in other_depth:
+                # The whole level is finished before returning, since a
+                # later neighbor may sit closer to the other side's root.
+                length = next_depth + other_depth[neighbor]
+                if best is None or length < best:
+                    best = length
+                    meeting = neighbor
+    if stats is not None:
+        stats.frontier(len(next_frontier))
+    return next_frontier, meeting
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Joins the forward and backward search trees on `meeting` into a
+    list of (movie_id, person_id) pairs from source to target.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, child = backward[person_id]
+        path.append((movie_id, child))
+        person_id = child
+    return path
+
+
+def shortest_path_dag(source, target):
+    """
+    Returns the parents DAG of all shortest paths from source to target:
+    a dict mapping each person on some shortest path (except the source)
+    to the (movie_id, person_id) steps one level closer to the source.
+
+    Returns None if the two people are not connected.
+    """
+    if source == target:
+        return {}
+
+    # person_id -> [(movie_id, parent person_id), ...] for the BFS levels
+    parents = {source: []}
+    frontier = [source]
+    while frontier and target not in parents:
+        level = {}
+        for person_id in frontier:
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor in parents:
                     continue
-                    
-    solutions = None               
-    while len(stack.frontier) != 0 and solutions == None:        
-        solutions = create_stack()
-
-    return solutions
-        
-        
+                level.setdefault(neighbor, []).append((movie_id, person_id))
+        parents.update(level)
+        frontier = list(level)
+
+    if target not in parents:
+        return None
+
+    # Keep only people from which the target is reachable in the DAG
+    dag = {}
+    stack = [target]
+    while stack:
+        person_id = stack.pop()
+        if person_id in dag or person_id == source:
+            continue
+        dag[person_id] = parents[person_id]
+        stack.extend(parent for _, parent in parents[person_id])
+    return dag
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, lazily, so callers can stop
+    early on hub-heavy graphs where there are very many.
+
+    Yields nothing if the two people are not connected.
+    """
+    dag = shortest_path_dag(source, target)
+    if dag is None:
+        return
+    if source == target:
+        yield []
+        return
+
+    # Depth-first walk back from the target; each stack entry is the
+    # path suffix found so far, starting at the person it begins with
+    stack = [(target, [])]
+    while stack:
+        person_id, suffix = stack.pop()
+        if person_id == source:
+            yield suffix
+            continue
+        for movie_id, parent in dag[person_id]:
+            stack.append((parent, [(movie_id, person_id)] + suffix))
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Yields up to k (all, if k is None) simple paths from source to
+    target as lists of (movie_id, person_id) pairs, shortest first,
+    using Yen's algorithm. Paths are generated lazily, one search round
+    per path, so callers only pay for the paths they consume.
+    """
+    path = shortest_path(source, target)
+    if path is None:
+        return
+    found = [path]
+    yield path
+    if source == target:
+        return
+
+    candidates = []
+    queued = {tuple(path)}
+    counter = 0
+    while k is None or len(found) < k:
+        previous = [(None, source)] + found[-1]
+        for i in range(len(previous) - 1):
+            spur = previous[i][1]
+            root = previous[:i + 1]
+
+            # Steps out of the spur node already used by paths sharing
+            # this root, and people already on the root
+            banned_steps = set()
+            for other in found:
+                full = [(None, source)] + other
+                if full[:i + 1] == root and len(full) > i + 1:
+                    banned_steps.add(full[i + 1])
+            banned_people = {person_id for _, person_id in root[:-1]}
+
+            spur_path = restricted_path(spur, target, banned_people, banned_steps)
+            if spur_path is None:
+                continue
+            candidate = root[1:] + spur_path
+            key = tuple(candidate)
+            if key in queued:
+                continue
+            queued.add(key)
+            counter += 1
+            heapq.heappush(candidates, (len(candidate), counter, candidate))
+
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+        yield path
+
+
+def restricted_path(source, target, banned_people, banned_steps):
+    """
+    Breadth-first search that avoids `banned_people` everywhere and the
+    (movie_id, person_id) `banned_steps` out of the source. Returns the
+    shortest list of (movie_id, person_id) pairs, or None.
+    """
+    if source == target:
+        return []
+    parents = {source: None}
+    frontier = deque([source])
+    while frontier:
+        person_id = frontier.popleft()
+        for step in neighbors_for_person(person_id):
+            movie_id, neighbor = step
+            if neighbor in parents or neighbor in banned_people:
+                continue
+            if person_id == source and step in banned_steps:
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            if neighbor == target:
+                path = []
+                while parents[neighbor] is not None:
+                    movie_id, parent = parents[neighbor]
+                    path.append((movie_id, neighbor))
+                    neighbor = parent
+                path.reverse()
+                return path
+            frontier.append(neighbor)
+    return None
+
+
+def load_landmarks(directory, k=16):
+    """
+    Loads (building and saving it if needed) a landmark index with k
+    landmarks over the csr `graph`.
+    """
+    global landmark_index, stale_landmarks
+    landmark_index = LandmarkIndex.load(graph, directory, k)
+    stale_landmarks = None
+
+
+def rebuild_landmarks(directory=None):
+    """
+    Rebuilds a landmark index that apply_delta dropped, loading it from
+    (or saving it to) `directory` if given.
+    """
+    global landmark_index, stale_landmarks
+    if stale_landmarks is None:
+        return
+    if directory is None:
+        landmark_index = LandmarkIndex.build(graph, stale_landmarks)
+    else:
+        landmark_index = LandmarkIndex.load(graph, directory, stale_landmarks)
+    stale_landmarks = None
+
+
+def distance_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two people from the landmark index, without searching.
+
+    With a movie filter active only the lower bound holds, and upper is
+    math.inf. A landmark index dropped by apply_delta is rebuilt first,
+    and with none loaded a default one is built over the csr `graph`.
+    """
+    global landmark_index
+    rebuild_landmarks()
+    if landmark_index is None:
+        if graph is None:
+            raise ValueError("distance_bounds needs the csr backend and a landmark index")
+        landmark_index = LandmarkIndex.build(graph)
+    lower, upper = landmark_index.bounds_for(source, target)
+    if blocked_movies is not None:
+        upper = math.inf
+    return lower, upper
+
+
+def set_movie_filter(movie_filter):
+    """
+    Restricts searches and neighbors_for_person to the movies accepted
+    by `movie_filter` (a filters.MovieFilter, or None for all movies).
+    The blocked movies are computed once here, over the loaded data.
+    """
+    global blocked_movies, active_filter
+    active_filter = movie_filter
+    if movie_filter is None or not movie_filter.active():
+        blocked_movies = None
+    elif graph is not None:
+        blocked_movies = movie_filter.blocked_mask(graph)
+    else:
+        blocked_movies = movie_filter.blocked_ids(movies)
+
+
+def apply_delta(delta, directory=None):
+    """
+    Applies an updates.Delta of added, changed and removed people,
+    movies and stars to the loaded data, without reloading it.
+
+    The movie filter is recomputed. A loaded landmark index is dropped,
+    since rebuilding it means a BFS per landmark over the whole graph:
+    searches fall back to plain BFS until distance_bounds or
+    rebuild_landmarks builds it again. If `directory` is given, the
+    updated csr graph is snapshotted there (see snapshot.save_graph).
+    """
+    global landmark_index, stale_landmarks
+    if graph is not None:
+        updates.apply_to_graph(graph, delta)
+    else:
+        updates.apply_to_dicts(people, movies, names, delta,
+                               name_index, name_index_ids)
+    set_movie_filter(active_filter)
+    if landmark_index is not None:
+        stale_landmarks = landmark_index.k
+        landmark_index = None
+
+    if directory is not None and graph is not None:
+        snapshot.save_graph(graph, directory)
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = graph.ids_for_name(name)
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            name = person_name(person_id)
+            birth = person_birth(person_id)
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -195,12 +614,41 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def suggest_names(name, k=5):
+    """
+    Returns up to k (name, person_ids) pairs for the names closest to
+    `name`, best first.
+    """
+    if graph is not None:
+        return graph.suggest_names(name, k)
+    if name_index is None:
+        return []
+    return [
+        (people[name_index_ids[ids[0]]]["name"], [name_index_ids[i] for i in ids])
+        for _, ids, _ in name_index.suggest(name, k)
+    ]
+
+
+def not_found(name):
+    """
+    Exits after suggesting names close to one that matched nobody.
+    """
+    suggestions = suggest_names(name)
+    if suggestions:
+        print("Did you mean: " + ", ".join(n for n, _ in suggestions) + "?")
+    sys.exit("Person not found.")
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id, blocked_movies)
     movie_ids = people[person_id]["movies"]
+    if blocked_movies:
+        movie_ids = movie_ids - blocked_movies
     neighbors = set()
     for movie_id in movie_ids:
         for person_id in movies[movie_id]["stars"]:
@@ -208,5 +656,32 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def person_name(person_id):
+    """
+    Returns the name of a person, whichever backend holds the data.
+    """
+    if graph is not None:
+        return graph.person_names[graph.person_index[person_id]]
+    return people[person_id]["name"]
+
+
+def person_birth(person_id):
+    """
+    Returns the birth year of a person, whichever backend holds the data.
+    """
+    if graph is not None:
+        return graph.person_births[graph.person_index[person_id]]
+    return people[person_id]["birth"]
+
+
+def movie_title(movie_id):
+    """
+    Returns the title of a movie, whichever backend holds the data.
+    """
+    if graph is not None:
+        return graph.movie_titles[graph.movie_index[movie_id]]
+    return movies[movie_id]["title"]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,71 @@
+"""
+Movie filters for degrees searches.
+
+A MovieFilter is turned once into a table of blocked movies, which
+searches consult instead of copying the graph: a bytearray over movie
+indices for the csr graph, a set of movie_ids for the dict backend.
+The csr searches start their "movie already expanded" table as a copy
+of the blocked one, so a filtered search costs the same as an
+unfiltered one.
+"""
+
+
+class MovieFilter():
+
+    def __init__(self, min_year=None, max_year=None, max_stars=None):
+        # Inclusive year window; either end may be open
+        self.min_year = min_year
+        self.max_year = max_year
+        # Movies with more stars than this (ensemble casts) are dropped
+        self.max_stars = max_stars
+
+    def __repr__(self):
+        return (f"MovieFilter(min_year={self.min_year!r}, max_year={self.max_year!r},"
+                f" max_stars={self.max_stars!r})")
+
+    def active(self):
+        return (self.min_year is not None or self.max_year is not None
+                or self.max_stars is not None)
+
+    def accepts(self, year, num_stars):
+        """
+        Returns True if a movie from `year` (a string, as in movies.csv)
+        with `num_stars` stars passes the filter. Movies without a
+        usable year fail any year window.
+        """
+        if self.max_stars is not None and num_stars > self.max_stars:
+            return False
+        if self.min_year is None and self.max_year is None:
+            return True
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            return False
+        if self.min_year is not None and year < self.min_year:
+            return False
+        if self.max_year is not None and year > self.max_year:
+            return False
+        return True
+
+    def blocked_mask(self, graph):
+        """
+        Returns a bytearray over the movie indices of a csr graph, with
+        1 for every movie the filter rejects.
+        """
+        movie_offsets = graph.movie_offsets
+        years = graph.movie_years
+        blocked = bytearray(graph.num_movies())
+        for m in range(graph.num_movies()):
+            if not self.accepts(years[m], movie_offsets[m + 1] - movie_offsets[m]):
+                blocked[m] = 1
+        return blocked
+
+    def blocked_ids(self, movies):
+        """
+        Returns the set of movie_ids in a `movies` map that the filter
+        rejects.
+        """
+        return {
+            movie_id for movie_id, movie in movies.items()
+            if not self.accepts(movie["year"], len(movie["stars"]))
+        }
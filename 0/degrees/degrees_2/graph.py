@@ -0,0 +1,509 @@
+"""
+Compact integer-indexed graph backend for the degrees dataset.
+
+People and movies are interned to dense ints, and the bipartite
+person -> movie and movie -> person edges are stored in compressed
+sparse row (CSR) form: the movies of person p are
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]
+
+and likewise for the stars of a movie. Searches walk these offsets
+directly instead of building sets of (movie_id, person_id) tuples.
+"""
+
+from array import array
+
+from loader import read_chunks
+from nameindex import NameIndex
+
+
+class Graph():
+
+    def __init__(self):
+        # Interned tables: index -> IMDb id / attributes
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # IMDb id -> index
+        self.person_index = {}
+        self.movie_index = {}
+
+        # CSR adjacency
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_stars = array("i")
+
+        # Name lookup index, built on first use by name_index()
+        self.names = None
+
+        # (digest, count) of the updates.Delta applied since the CSVs
+        # were read, (0, 0) for none
+        self.deltas = (0, 0)
+
+    @classmethod
+    def from_csv(cls, directory, stats=None):
+        """
+        Builds a graph straight from the CSV files in `directory`,
+        without going through the per-person dictionaries. Rows are
+        streamed in chunks; load statistics go to `stats` if given.
+        """
+        graph = cls()
+        add_person = graph.add_person
+        for chunk in read_chunks(directory, "people.csv", stats=stats):
+            for person_id, name, birth in chunk:
+                add_person(person_id, name, birth)
+
+        add_movie = graph.add_movie
+        for chunk in read_chunks(directory, "movies.csv", stats=stats):
+            for movie_id, title, year in chunk:
+                add_movie(movie_id, title, year)
+
+        edge_people = array("i")
+        edge_movies = array("i")
+        person_index = graph.person_index
+        movie_index = graph.movie_index
+        for chunk in read_chunks(directory, "stars.csv", stats=stats):
+            known = [
+                (person_index[person_id], movie_index[movie_id])
+                for person_id, movie_id in chunk
+                if person_id in person_index and movie_id in movie_index
+            ]
+            if stats is not None:
+                stats.skipped += len(chunk) - len(known)
+            for p, m in known:
+                edge_people.append(p)
+                edge_movies.append(m)
+
+        graph.build(edge_people, edge_movies)
+        return graph
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Builds a graph from the `people` and `movies` maps of degrees.py.
+        """
+        graph = cls()
+        for person_id, person in people.items():
+            graph.add_person(person_id, person["name"], person["birth"])
+        for movie_id, movie in movies.items():
+            graph.add_movie(movie_id, movie["title"], movie["year"])
+
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, person in people.items():
+            p = graph.person_index[person_id]
+            for movie_id in person["movies"]:
+                edge_people.append(p)
+                edge_movies.append(graph.movie_index[movie_id])
+
+        graph.build(edge_people, edge_movies)
+        return graph
+
+    def add_person(self, person_id, name, birth):
+        """
+        Interns a person and returns their index.
+        """
+        index = self.person_index.get(person_id)
+        if index is None:
+            index = len(self.person_ids)
+            self.person_index[person_id] = index
+            self.person_ids.append(person_id)
+            self.person_names.append(name)
+            self.person_births.append(birth)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Interns a movie and returns its index.
+        """
+        index = self.movie_index.get(movie_id)
+        if index is None:
+            index = len(self.movie_ids)
+            self.movie_index[movie_id] = index
+            self.movie_ids.append(movie_id)
+            self.movie_titles.append(title)
+            self.movie_years.append(year)
+        return index
+
+    def build(self, edge_people, edge_movies):
+        """
+        Builds both CSR directions from parallel arrays of
+        (person index, movie index) edges. Duplicate edges are dropped.
+        """
+        offsets, movies = csr(len(self.person_ids), edge_people, edge_movies)
+
+        # Sort each person's movies and drop adjacent duplicates,
+        # compacting the rows in place
+        people = array("i")
+        write = 0
+        start = 0
+        for p in range(len(self.person_ids)):
+            end = offsets[p + 1]
+            previous = -1
+            for m in sorted(movies[start:end]):
+                if m != previous:
+                    movies[write] = m
+                    write += 1
+                    previous = m
+            people.extend(array("i", [p]) * (write - offsets[p]))
+            start = end
+            offsets[p + 1] = write
+        del movies[write:]
+
+        self.person_offsets, self.person_movies = offsets, movies
+        self.movie_offsets, self.movie_stars = csr(len(self.movie_ids), movies, people)
+
+    def name_index(self):
+        """
+        Returns the NameIndex over person names, building it if needed.
+        """
+        if self.names is None:
+            self.names = NameIndex.build(self.person_names)
+        return self.names
+
+    def ids_for_name(self, name):
+        """
+        Returns the IMDb ids of people with this name, ignoring case.
+        """
+        return [self.person_ids[p] for p in self.name_index().lookup(name)]
+
+    def suggest_names(self, name, k=5):
+        """
+        Returns up to k (name, IMDb ids) pairs for the names closest to
+        `name`, best first.
+        """
+        return [
+            (self.person_names[people[0]], [self.person_ids[p] for p in people])
+            for _, people, _ in self.name_index().suggest(name, k)
+        ]
+
+    def num_people(self):
+        return len(self.person_ids)
+
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def num_edges(self):
+        return len(self.person_movies)
+
+    def movies_of(self, p):
+        """
+        Returns the movie indices person index `p` starred in.
+        """
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        """
+        Returns the person indices who starred in movie index `m`.
+        """
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p, blocked=None):
+        """
+        Yields (movie index, person index) pairs for people who starred
+        with person index `p`, skipping movies flagged in `blocked`.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for k in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[k]
+            if blocked is not None and blocked[m]:
+                continue
+            for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                yield m, movie_stars[j]
+
+    def neighbors_for_person(self, person_id, blocked=None):
+        """
+        Returns (movie_id, person_id) pairs for people who starred with
+        a given person, in the same format as degrees.neighbors_for_person.
+        """
+        movie_ids = self.movie_ids
+        person_ids = self.person_ids
+        return {
+            (movie_ids[m], person_ids[q])
+            for m, q in self.neighbors(self.person_index[person_id], blocked)
+        }
+
+    def shortest_path(self, source, target, bidirectional=False, blocked=None,
+                      stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to the target, or None if not connected.
+
+        Movies flagged in the `blocked` bytearray (see filters.py) are
+        left out of the search. Counters go to `stats` (a
+        util.SearchStats) if given.
+        """
+        if source == target:
+            return []
+        s = self.person_index[source]
+        t = self.person_index[target]
+        if bidirectional:
+            path = self.bidirectional_search(s, t, blocked, stats)
+        else:
+            path = self.search(s, t, blocked, stats)
+        if path is None:
+            return None
+        return [(self.movie_ids[m], self.person_ids[p]) for m, p in path]
+
+    def search(self, s, t, blocked=None, stats=None):
+        """
+        Breadth-first search between person indices. Returns a list of
+        (movie index, person index) pairs, or None.
+
+        Every movie's cast is scanned at most once, so the search is
+        linear in the number of edges it touches. Blocked movies start
+        out marked as scanned, which filters them at no extra cost.
+
+        With `stats`, people are counted per level and casts per movie;
+        the inner loop over cast members is never instrumented, so the
+        cast being scanned when the target is found counts in full.
+        """
+        if s == t:
+            return []
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        movie_seen = self.movie_table(blocked)
+        parent[s] = s
+        frontier = [s]
+        counting = stats is not None
+        casts = members = reached = 0
+
+        while frontier:
+            if counting:
+                stats.nodes_expanded += len(frontier)
+                stats.frontier(len(frontier))
+            next_frontier = []
+            for p in frontier:
+                for k in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[k]
+                    if movie_seen[m]:
+                        continue
+                    movie_seen[m] = 1
+                    if counting:
+                        casts += 1
+                        members += movie_offsets[m + 1] - movie_offsets[m]
+                    for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                        q = movie_stars[j]
+                        if parent[q] != -1:
+                            continue
+                        parent[q] = p
+                        via[q] = m
+                        if q == t:
+                            if counting:
+                                count_scans(stats, casts, members,
+                                            reached + len(next_frontier) + 1)
+                            return trace(parent, via, s, t)
+                        next_frontier.append(q)
+            reached += len(next_frontier)
+            frontier = next_frontier
+
+        if counting:
+            count_scans(stats, casts, members, reached)
+        return None
+
+    def tree(self, s, targets=None, blocked=None):
+        """
+        Breadth-first search tree rooted at person index `s`, as
+        (parent, via) arrays: for every reached person q other than s,
+        parent[q] is the previous person and via[q] the shared movie.
+        Unreached people have parent -1.
+
+        If `targets` is given, the search stops once all of them are
+        reached instead of covering the whole component. Movies flagged
+        in `blocked` are left out.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        movie_seen = self.movie_table(blocked)
+        parent[s] = s
+        remaining = None
+        if targets is not None:
+            remaining = set(targets)
+            remaining.discard(s)
+            if not remaining:
+                return parent, via
+        frontier = [s]
+
+        while frontier:
+            next_frontier = []
+            for p in frontier:
+                for k in range(person_offsets[p], person_offsets[p + 1]):
+                    m = person_movies[k]
+                    if movie_seen[m]:
+                        continue
+                    movie_seen[m] = 1
+                    for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                        q = movie_stars[j]
+                        if parent[q] != -1:
+                            continue
+                        parent[q] = p
+                        via[q] = m
+                        next_frontier.append(q)
+                        if remaining is not None and q in remaining:
+                            remaining.discard(q)
+                            if not remaining:
+                                return parent, via
+            frontier = next_frontier
+
+        return parent, via
+
+    def movie_table(self, blocked=None):
+        """
+        Returns a fresh "movie already scanned" table for a search,
+        with blocked movies pre-marked.
+        """
+        if blocked is None:
+            return bytearray(len(self.movie_ids))
+        return bytearray(blocked)
+
+    def bidirectional_search(self, s, t, blocked=None, stats=None):
+        """
+        Bidirectional breadth-first search between person indices,
+        always expanding the smaller frontier by one whole level.
+        Returns a list of (movie index, person index) pairs, or None.
+        """
+        if s == t:
+            return []
+        n = len(self.person_ids)
+        forward = Side(s, n, self.movie_table(blocked))
+        backward = Side(t, n, self.movie_table(blocked))
+
+        while forward.frontier and backward.frontier:
+            if len(forward.frontier) <= len(backward.frontier):
+                meeting = self.expand(forward, backward, stats)
+            else:
+                meeting = self.expand(backward, forward, stats)
+            if meeting != -1:
+                path = trace(forward.parent, forward.via, s, meeting)
+                q = meeting
+                while q != t:
+                    path.append((backward.via[q], backward.parent[q]))
+                    q = backward.parent[q]
+                return path
+
+        return None
+
+    def expand(self, side, other, stats=None):
+        """
+        Expands one level of `side`. Returns the reached person index on
+        the shortest path through this level, or -1.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        parent = side.parent
+        via = side.via
+        depth = side.depth
+        movie_seen = side.movie_seen
+        other_depth = other.depth
+        counting = stats is not None
+        casts = members = 0
+
+        next_frontier = []
+        meeting = -1
+        best = -1
+        for p in side.frontier:
+            next_depth = depth[p] + 1
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                if counting:
+                    casts += 1
+                    members += movie_offsets[m + 1] - movie_offsets[m]
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if depth[q] != -1:
+                        continue
+                    parent[q] = p
+                    via[q] = m
+                    depth[q] = next_depth
+                    next_frontier.append(q)
+                    if other_depth[q] != -1:
+                        length = next_depth + other_depth[q]
+                        if best == -1 or length < best:
+                            best = length
+                            meeting = q
+        if counting:
+            stats.nodes_expanded += len(side.frontier)
+            stats.frontier(len(next_frontier))
+            count_scans(stats, casts, members, len(next_frontier))
+        side.frontier = next_frontier
+        return meeting
+
+
+class Side():
+    """
+    State of one direction of a bidirectional search.
+    """
+
+    def __init__(self, root, num_people, movie_seen):
+        self.parent = array("i", [-1]) * num_people
+        self.via = array("i", [-1]) * num_people
+        self.depth = array("i", [-1]) * num_people
+        self.movie_seen = movie_seen
+        self.parent[root] = root
+        self.depth[root] = 0
+        self.frontier = [root]
+
+
+def csr(size, rows, columns):
+    """
+    Returns (offsets, values) arrays grouping `columns` by `rows`,
+    for row indices in range(size).
+    """
+    offsets = array("i", [0]) * (size + 1)
+    for r in rows:
+        offsets[r + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    values = array("i", [0]) * len(columns)
+    cursor = offsets[:-1]
+    for r, c in zip(rows, columns):
+        values[cursor[r]] = c
+        cursor[r] += 1
+    return offsets, values
+
+
+def count_scans(stats, casts, members, reached):
+    """
+    Adds `casts` movie casts of `members` people in total, of whom
+    `reached` were new, to a SearchStats.
+    """
+    stats.neighbor_calls += casts
+    stats.duplicates += members - reached
+
+
+def trace(parent, via, s, t):
+    """
+    Follows BFS parent pointers from t back to s and returns the
+    (movie index, person index) pairs from s to t.
+    """
+    path = []
+    q = t
+    while q != s:
+        path.append((via[q], q))
+        q = parent[q]
+    path.reverse()
+    return path
@@ -0,0 +1,242 @@
+"""
+Landmark distance index for the degrees graph.
+
+A handful of high-degree people are picked as landmarks and their
+separation to every person is stored as one byte per person. By the
+triangle inequality, for any landmark L
+
+    |d(L, s) - d(L, t)|  <=  d(s, t)  <=  d(L, s) + d(L, t)
+
+so distance bounds between any two people cost O(k) array reads. A
+landmark that reaches only one of them proves they are not connected,
+which lets shortest_path answer None without searching a whole
+component. The bounds do not guide the search itself: an A* over them
+expands fewer people than BFS, but the bookkeeping per person in Python
+made it several times slower than the CSR searches.
+
+The index is saved as degrees.landmarks next to the CSVs, tagged with
+the same CSV signature as the graph snapshot, and memory-mapped on load.
+An index over a graph updated by deltas goes to degrees.updated.landmarks
+instead, tagged with the deltas as well.
+
+Usage: python landmarks.py [directory] [-k K] [--bounds SOURCE TARGET]
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+from array import array
+
+import snapshot
+
+MAGIC = b"DGLM"
+VERSION = 2
+FILENAME = "degrees.landmarks"
+UPDATED = "degrees.updated.landmarks"
+HEADER = struct.Struct("<4sIIII")
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+
+    def __init__(self, graph, landmarks, distances, k=None):
+        self.graph = graph
+        # Number of landmarks asked for; fewer exist in tiny graphs
+        self.k = len(landmarks) if k is None else k
+        # Person indices of the landmarks
+        self.landmarks = landmarks
+        # distances[i * num_people + p] = separation of landmark i and p
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Builds an index over the k people with the most co-star edges.
+        """
+        landmarks = array("i", pick_landmarks(graph, k))
+        distances = array("B")
+        for landmark in landmarks:
+            distances.extend(bfs_distances(graph, landmark))
+        return cls(graph, landmarks, distances, k)
+
+    @classmethod
+    def load(cls, graph, directory, k=16):
+        """
+        Returns the saved index for `directory` if it is current and has
+        k landmarks, otherwise builds and saves a new one.
+        """
+        name = FILENAME if graph.deltas == (0, 0) else UPDATED
+        path = os.path.join(directory, name)
+        source_signature = snapshot.signature(directory, graph.deltas)
+        index = read(graph, path, source_signature, k)
+        if index is None:
+            index = cls.build(graph, k)
+            try:
+                index.save(path, source_signature)
+            except OSError:
+                pass
+        return index
+
+    def save(self, path, source_signature):
+        """
+        Writes the index to `path`, atomically.
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.k, len(self.landmarks),
+                                self.graph.num_people()))
+            for mtime, size in source_signature:
+                f.write(snapshot.SIGNATURE.pack(mtime, size))
+            array("i", self.landmarks).tofile(f)
+            array("B", self.distances).tofile(f)
+        os.replace(tmp, path)
+
+    def distance(self, i, p):
+        return self.distances[i * self.graph.num_people() + p]
+
+    def bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the separation of person indices
+        s and t. Both are math.inf when a landmark proves they are not
+        connected; upper is math.inf when no landmark reaches either.
+        """
+        if s == t:
+            return 0, 0
+        n = self.graph.num_people()
+        distances = self.distances
+        lower = 1
+        upper = math.inf
+        for i in range(len(self.landmarks)):
+            ds = distances[i * n + s]
+            dt = distances[i * n + t]
+            if ds == UNREACHABLE and dt == UNREACHABLE:
+                continue
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(ds - dt))
+            upper = min(upper, ds + dt)
+        return lower, upper
+
+    def bounds_for(self, source, target):
+        """
+        Returns the distance bounds between two IMDb person ids.
+        """
+        index = self.graph.person_index
+        return self.bounds(index[source], index[target])
+
+
+def pick_landmarks(graph, k):
+    """
+    Returns the k person indices with the most co-star edges, counted
+    as the sum of the cast sizes of their movies.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    degree = []
+    for p in range(graph.num_people()):
+        total = 0
+        for j in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[j]
+            total += movie_offsets[m + 1] - movie_offsets[m] - 1
+        degree.append(total)
+    ranked = sorted(range(graph.num_people()), key=degree.__getitem__, reverse=True)
+    return [p for p in ranked[:k] if degree[p] > 0]
+
+
+def bfs_distances(graph, s):
+    """
+    Returns an array('B') of separations from person index s, capped
+    below UNREACHABLE.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    distances = array("B", [UNREACHABLE]) * graph.num_people()
+    movie_seen = bytearray(graph.num_movies())
+    distances[s] = 0
+    frontier = [s]
+    depth = 0
+    while frontier:
+        depth = min(depth + 1, UNREACHABLE - 1)
+        next_frontier = []
+        for p in frontier:
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if distances[q] == UNREACHABLE:
+                        distances[q] = depth
+                        next_frontier.append(q)
+        frontier = next_frontier
+    return distances
+
+
+def read(graph, path, source_signature, k):
+    """
+    Returns the index mapped from `path`, or None if it is missing,
+    stale or built with a different k.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        magic, version, requested, count, num_people = HEADER.unpack(header)
+        if (magic != MAGIC or version != VERSION or requested != k
+                or num_people != graph.num_people()):
+            return None
+        stored = [
+            snapshot.SIGNATURE.unpack(f.read(snapshot.SIGNATURE.size))
+            for _ in source_signature
+        ]
+        if stored != [tuple(s) for s in source_signature]:
+            return None
+        landmarks = array("i")
+        landmarks.fromfile(f, count)
+        start = f.tell()
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    distances = memoryview(mapped)[start:start + count * num_people]
+    return LandmarkIndex(graph, landmarks, distances, k)
+
+
+def main():
+    import degrees
+
+    parser = argparse.ArgumentParser(
+        usage="python landmarks.py [directory] [-k K] [--bounds SOURCE TARGET]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", type=int, default=16, help="number of landmarks")
+    parser.add_argument("--bounds", nargs=2, metavar=("SOURCE", "TARGET"),
+                        help="print separation bounds for two person ids")
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory, "csr")
+    index = LandmarkIndex.load(degrees.graph, args.directory, args.k)
+    names = [degrees.graph.person_names[p] for p in index.landmarks]
+    print(f"{len(names)} landmarks: {', '.join(names)}")
+
+    if args.bounds:
+        lower, upper = index.bounds_for(*args.bounds)
+        if lower == math.inf:
+            print("Not connected.")
+        else:
+            print(f"Between {lower} and {upper} degrees of separation.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Streaming CSV ingestion for the degrees dataset.
+
+Rows are parsed with csv.reader and handed out as plain field tuples in
+chunks of `chunk_size`, so parsing never holds more than one chunk of
+raw rows and no per-row dict is built. The fields are picked by the
+names in each file's header, in the order COLUMNS lists them, so a file
+may order its columns any way; blank and short rows are skipped. Each file may also be gzip-compressed
+(people.csv.gz and so on); the plain file wins if both exist.
+"""
+
+import csv
+import gzip
+import os
+import time
+from itertools import islice
+from operator import itemgetter
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is then not reported
+    resource = None
+
+CHUNK_SIZE = 65536
+
+# File name, without .csv -> the columns its rows are handed out as
+COLUMNS = {
+    "people": ("id", "name", "birth"),
+    "movies": ("id", "title", "year"),
+    "stars": ("person_id", "movie_id"),
+    "people_removed": ("id",),
+    "movies_removed": ("id",),
+    "stars_removed": ("person_id", "movie_id"),
+}
+
+
+class LoadStats():
+    """
+    Rows, time and peak memory of a load, per file.
+    """
+
+    def __init__(self):
+        # file name -> [rows, seconds]
+        self.files = {}
+        self.skipped = 0
+
+    def record(self, name, rows, seconds):
+        entry = self.files.setdefault(name, [0, 0.0])
+        entry[0] += rows
+        entry[1] += seconds
+
+    def rows(self):
+        return sum(rows for rows, _ in self.files.values())
+
+    def seconds(self):
+        return sum(seconds for _, seconds in self.files.values())
+
+    def report(self):
+        """
+        Returns a human-readable summary.
+        """
+        lines = []
+        for name, (rows, seconds) in self.files.items():
+            lines.append(f"{name}: {rows} rows in {seconds:.2f}s"
+                         f" ({rate(rows, seconds)} rows/s)")
+        lines.append(f"Total: {self.rows()} rows in {self.seconds():.2f}s"
+                     f" ({rate(self.rows(), self.seconds())} rows/s)")
+        if self.skipped:
+            lines.append(f"Skipped {self.skipped} blank or short rows"
+                         " and stars rows with unknown ids")
+        peak = peak_memory()
+        if peak is not None:
+            lines.append(f"Peak memory: {peak / 2 ** 20:.1f} MiB")
+        return "\n".join(lines)
+
+
+def rate(rows, seconds):
+    return f"{rows / seconds:,.0f}" if seconds > 0 else "-"
+
+
+def peak_memory():
+    """
+    Returns the peak resident set size of this process in bytes, or None
+    where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def find(directory, name):
+    """
+    Returns the path of `name` in `directory`, or of its .gz version if
+    only that exists.
+    """
+    path = os.path.join(directory, name)
+    if not os.path.exists(path) and os.path.exists(f"{path}.gz"):
+        return f"{path}.gz"
+    return path
+
+
+def open_csv(path):
+    """
+    Opens a CSV file for reading, decompressing .gz files on the fly.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def fields(header, name):
+    """
+    Returns a function picking the COLUMNS of `name` out of a row, and
+    the length a row needs for it, given the file's header row.
+    """
+    columns = COLUMNS[name.removesuffix(".csv")]
+    header = [column.strip() for column in header]
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"{name} has no {', '.join(missing)} column")
+    positions = [header.index(column) for column in columns]
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda row: (row[position],), position + 1
+    return itemgetter(*positions), max(positions) + 1
+
+
+def read_chunks(directory, name, chunk_size=CHUNK_SIZE, stats=None):
+    """
+    Yields lists of up to `chunk_size` rows from the CSV `name` in
+    `directory`, each a tuple of the file's COLUMNS, found by name in
+    its header. Blank rows and rows too short to hold those columns are
+    skipped and, if `stats` is given, counted in stats.skipped; the rows
+    read and the time until the last chunk is consumed are recorded in
+    it under `name`.
+    """
+    start = time.perf_counter()
+    rows = 0
+    try:
+        with open_csv(find(directory, name)) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            pick, width = fields(header, name)
+            while True:
+                chunk = list(islice(reader, chunk_size))
+                if not chunk:
+                    return
+                rows += len(chunk)
+                picked = [pick(row) for row in chunk if len(row) >= width]
+                if stats is not None:
+                    stats.skipped += len(chunk) - len(picked)
+                if picked:
+                    yield picked
+    finally:
+        if stats is not None:
+            stats.record(name, rows, time.perf_counter() - start)
@@ -0,0 +1,123 @@
+"""
+Load test for server.py.
+
+Sends /path requests for random pairs of people (or the pairs in a CSV
+file, as for batch.py) over a number of concurrent keep-alive
+connections, then reports throughput and latency percentiles.
+
+Usage: python loadtest.py [directory] [--url URL] [--requests N]
+                          [--concurrency C] [--pairs file] [--seed S]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+from batch import read_pairs
+from loader import read_chunks
+
+
+async def client(host, port, queue, latencies, errors):
+    """
+    Sends the queued (source, target) pairs over one connection,
+    recording each request's latency in seconds.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            source, target = queue.get_nowait()
+            query = urlencode({"source": source, "target": target})
+            start = time.perf_counter()
+            writer.write(f"GET /path?{query} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                if key.strip().lower() == "content-length":
+                    length = int(value)
+            json.loads(await reader.readexactly(length))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(url, pairs, concurrency):
+    """
+    Returns (latencies, error statuses, elapsed seconds) for sending all
+    `pairs` over `concurrency` connections.
+    """
+    parts = urlsplit(url)
+    queue = asyncio.Queue()
+    for pair in pairs:
+        queue.put_nowait(pair)
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(parts.hostname, parts.port or 80, queue, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of sorted `values` (nearest rank).
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def random_pairs(directory, n, seed=None):
+    """
+    Returns n random (source, target) pairs of person ids in `directory`.
+    """
+    person_ids = [row[0] for chunk in read_chunks(directory, "people.csv") for row in chunk]
+    rng = random.Random(seed)
+    return [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python loadtest.py [directory] [--url URL] [--requests N]"
+              " [--concurrency C] [--pairs file] [--seed S]"
+    )
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="dataset to draw random people from")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pairs", help="CSV of source,target pairs to send instead")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.pairs:
+        with open(args.pairs, encoding="utf-8", newline="") as f:
+            pairs = read_pairs(f)
+    else:
+        pairs = random_pairs(args.directory, args.requests, args.seed)
+
+    latencies, errors, elapsed = asyncio.run(run(args.url, pairs, args.concurrency))
+    latencies.sort()
+    print(f"Requests: {len(latencies)} in {elapsed:.2f}s"
+          f" ({len(latencies) / elapsed:,.0f} req/s), {len(errors)} errors")
+    if latencies:
+        for p in (50, 90, 99):
+            print(f"p{p}: {percentile(latencies, p) * 1000:.2f} ms")
+        print(f"max: {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Name lookup index for the degrees dataset.
+
+Distinct lower-cased names are kept sorted, each with the person indices
+that carry it, which answers exact and prefix lookups by binary search.
+A trigram index over the same names finds fuzzy candidates, which are
+then ranked by edit distance to the query.
+
+Every table is either a list or an array-like with indexing and len(),
+so the index can be built in memory or mapped from a graph snapshot.
+Those tables are never modified; people added, renamed or removed
+later are kept in a small overlay that every lookup merges in.
+"""
+
+from array import array
+from collections import Counter
+
+# Candidates (by shared trigrams) that get an exact edit distance
+CANDIDATES = 100
+
+# Posting entries counted per query. Trigrams are counted rarest first,
+# and common ones past this budget are skipped, as they would pull in a
+# large part of the index while saying little about the match
+BUDGET = 50000
+
+
+class NameIndex():
+
+    def __init__(self, keys, key_offsets, key_people, grams, gram_offsets, gram_keys):
+        # Sorted distinct lower-case names, and the person indices of
+        # keys[i] in key_people[key_offsets[i]:key_offsets[i + 1]]
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.key_people = key_people
+        # Sorted trigrams, and the key indices containing grams[i] in
+        # gram_keys[gram_offsets[i]:gram_offsets[i + 1]]
+        self.grams = grams
+        self.gram_offsets = gram_offsets
+        self.gram_keys = gram_keys
+
+        # Overlay: person indices whose base entries are hidden, and
+        # key -> person indices (plus the reverse) for names added since
+        self.hidden = set()
+        self.added = {}
+        self.added_key = {}
+
+    @classmethod
+    def build(cls, names):
+        """
+        Builds an index over `names`, where names[p] is the name of
+        person index p. Empty names (removed people) are left out.
+        """
+        people_by_key = {}
+        for p, name in enumerate(names):
+            if name:
+                people_by_key.setdefault(name.lower(), []).append(p)
+        keys = sorted(people_by_key)
+
+        key_offsets = array("i", [0])
+        key_people = array("i")
+        keys_by_gram = {}
+        for i, key in enumerate(keys):
+            key_people.extend(people_by_key[key])
+            key_offsets.append(len(key_people))
+            for gram in trigrams(key):
+                keys_by_gram.setdefault(gram, []).append(i)
+        grams = sorted(keys_by_gram)
+
+        gram_offsets = array("i", [0])
+        gram_keys = array("i")
+        for gram in grams:
+            gram_keys.extend(keys_by_gram[gram])
+            gram_offsets.append(len(gram_keys))
+
+        return cls(keys, key_offsets, key_people, grams, gram_offsets, gram_keys)
+
+    def add(self, p, name):
+        """
+        Indexes person index p under `name`, replacing any name it had.
+        """
+        self.remove(p)
+        if name:
+            key = name.lower()
+            self.added.setdefault(key, []).append(p)
+            self.added_key[p] = key
+
+    def remove(self, p):
+        """
+        Drops person index p from the index.
+        """
+        self.hidden.add(p)
+        key = self.added_key.pop(p, None)
+        if key is not None:
+            self.added[key].remove(p)
+            if not self.added[key]:
+                del self.added[key]
+
+    def dirty(self):
+        """
+        Returns True if the overlay holds changes not in the base tables.
+        """
+        return bool(self.hidden or self.added)
+
+    def people(self, i):
+        """
+        Returns the person indices with key index i that the overlay
+        does not hide.
+        """
+        people = self.key_people[self.key_offsets[i]:self.key_offsets[i + 1]]
+        if not self.hidden:
+            return list(people)
+        return [p for p in people if p not in self.hidden]
+
+    def lookup(self, name):
+        """
+        Returns the person indices whose name is `name`, ignoring case.
+        """
+        key = name.lower()
+        result = []
+        i = bisect(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            result = self.people(i)
+        return result + self.added.get(key, [])
+
+    def prefix(self, prefix, k=10):
+        """
+        Returns up to k (name, person indices) pairs for names starting
+        with `prefix`, ignoring case, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        results = {}
+        i = bisect(self.keys, prefix)
+        while i < len(self.keys) and len(results) < k:
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            people = self.people(i)
+            if people:
+                results[key] = people
+            i += 1
+        for key, people in self.added.items():
+            if key.startswith(prefix):
+                results[key] = results.get(key, []) + people
+        return sorted(results.items())[:k]
+
+    def suggest(self, name, k=5):
+        """
+        Returns up to k (name, person indices, edit distance) triples for
+        the names closest to `name`, ignoring case.
+        """
+        query = name.lower()
+        # Hidden people may empty some base names, so rank a few extra
+        ranked = self.rank(query, k + min(len(self.hidden), CANDIDATES))
+        results = {}
+        for distance, shared_count, key, i in ranked:
+            people = self.people(i)
+            if people:
+                results[key] = [distance, shared_count, people]
+
+        # The overlay is small, so it is scored in full
+        for key, people in self.added.items():
+            if key in results:
+                results[key][2] = results[key][2] + people
+            else:
+                results[key] = [edit_distance(query, key), 0, people]
+
+        best = sorted((distance, shared_count, key, people)
+                      for key, (distance, shared_count, people) in results.items())
+        return [(key, people, distance) for distance, _, key, people in best[:k]]
+
+    def rank(self, query, k):
+        """
+        Returns up to k (edit distance, -shared trigrams, key, key index)
+        tuples for the base keys closest to `query`, best first.
+        """
+        postings = []
+        for gram in set(trigrams(query)):
+            g = bisect(self.grams, gram)
+            if g < len(self.grams) and self.grams[g] == gram:
+                postings.append((self.gram_offsets[g], self.gram_offsets[g + 1]))
+
+        postings.sort(key=lambda span: span[1] - span[0])
+        shared = Counter()
+        counted = 0
+        for n, (start, end) in enumerate(postings):
+            if n >= 2 and counted + end - start > BUDGET:
+                break
+            shared.update(self.gram_keys[start:end])
+            counted += end - start
+
+        ranked = []
+        limit = None
+        for i, count in shared.most_common(CANDIDATES):
+            key = self.keys[i]
+            distance = edit_distance(query, key, limit)
+            if distance is None:
+                continue
+            ranked.append((distance, -count, key, i))
+            if len(ranked) >= k:
+                ranked.sort()
+                del ranked[k:]
+                limit = ranked[-1][0]
+        ranked.sort()
+        return ranked
+
+
+def trigrams(key):
+    """
+    Returns the trigrams of a name, padded so that short names and the
+    start and end of names get trigrams of their own.
+    """
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bisect(table, key):
+    """
+    Returns the leftmost position in sorted `table` where `key` fits.
+    """
+    lo, hi = 0, len(table)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if table[mid] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def edit_distance(a, b, limit=None):
+    """
+    Returns the Levenshtein distance between two strings, or None once
+    it is known to exceed `limit`.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        left = i
+        for j, cb in enumerate(b, 1):
+            diagonal = previous[j - 1] if ca == cb else previous[j - 1] + 1
+            up = previous[j] + 1
+            left += 1
+            if up < left:
+                left = up
+            if diagonal < left:
+                left = diagonal
+            current.append(left)
+        if limit is not None and min(current) > limit:
+            return None
+        previous = current
+    return previous[-1]
@@ -0,0 +1,262 @@
+"""
+Local HTTP query server for the degrees dataset.
+
+The csr graph is loaded once and shared by every request. The server
+runs on asyncio, so slow searches never hold up other connections:
+searches are handed to a worker thread, or with --workers N to N forked
+processes that share the graph copy-on-write (as in batch.py). Answers
+are kept in an LRU cache, and concurrent requests for the same pair wait
+on one search instead of each starting their own.
+
+Endpoints (GET, JSON responses):
+
+    /path?source=A&target=B    shortest path; people by IMDb id or name
+    /person?name=N             people with a name, or suggestions
+    /stats                     request and cache counters
+
+Usage: python server.py [directory] [--host H] [--port P] [--workers N]
+                        [--cache-size N]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+from batch import init_worker
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Content Too Large", 500: "Internal Server Error",
+}
+
+# Largest request body read (and discarded) to keep a connection open
+MAX_BODY = 1 << 20
+
+
+class Server():
+
+    def __init__(self, graph, executor, cache_size=4096):
+        self.graph = graph
+        self.executor = executor
+        self.cache_size = cache_size
+        # (source_id, target_id) -> path, least recently used first
+        self.cache = OrderedDict()
+        # (source_id, target_id) -> future of a search in progress
+        self.pending = {}
+        self.counters = {"requests": 0, "searches": 0, "cache_hits": 0, "joined": 0}
+
+    async def handle(self, reader, writer):
+        """
+        Serves HTTP/1.1 requests on one connection until the client
+        closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                # No endpoint takes a body, but one left in the stream
+                # would be parsed as the next request, so it is read and
+                # dropped, or the connection is closed after the reply
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = headers.get("content-length", "0")
+                parts = request_line.decode("latin-1").split()
+                if "transfer-encoding" in headers:
+                    status, body = 411, {"error": "send a Content-Length, not chunks"}
+                    keep_alive = False
+                elif not length.isdigit():
+                    status, body = 400, {"error": "bad Content-Length"}
+                    keep_alive = False
+                elif int(length) > MAX_BODY:
+                    status, body = 413, {"error": f"body over {MAX_BODY} bytes"}
+                    keep_alive = False
+                else:
+                    if int(length):
+                        await reader.readexactly(int(length))
+                    if len(parts) != 3:
+                        status, body = 400, {"error": "malformed request"}
+                    elif parts[0] != "GET":
+                        status, body = 405, {"error": "only GET is supported"}
+                    else:
+                        try:
+                            status, body = await self.route(parts[1])
+                        except Exception as error:
+                            print(f"Error serving {parts[1]}: {error!r}", file=sys.stderr)
+                            status, body = 500, {"error": f"internal error: {error!r}"}
+
+                data = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    f"\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, target):
+        """
+        Returns (status, body) for a request target.
+        """
+        self.counters["requests"] += 1
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == "/path":
+            if "source" not in query or "target" not in query:
+                return 400, {"error": "source and target are required"}
+            return await self.path(query["source"], query["target"])
+        if url.path == "/person":
+            if "name" not in query:
+                return 400, {"error": "name is required"}
+            return await self.person(query["name"])
+        if url.path == "/stats":
+            return 200, dict(self.counters, cached=len(self.cache))
+        return 404, {"error": f"no such endpoint: {url.path}"}
+
+    async def path(self, source, target):
+        source_id = self.resolve(source)
+        target_id = self.resolve(target)
+        if source_id is None or target_id is None:
+            missing = source if source_id is None else target
+            return 404, {"error": f"person not found or ambiguous: {missing}"}
+
+        path = await self.shortest_path(source_id, target_id)
+        record = {"source": source_id, "target": target_id,
+                  "degrees": None, "path": None}
+        if path is not None:
+            record["degrees"] = len(path)
+            record["path"] = [[movie_id, person_id] for movie_id, person_id in path]
+        return 200, record
+
+    async def person(self, name):
+        graph = self.graph
+        people = [
+            {"id": person_id,
+             "name": graph.person_names[graph.person_index[person_id]],
+             "birth": graph.person_births[graph.person_index[person_id]]}
+            for person_id in graph.ids_for_name(name)
+        ]
+        if people:
+            return 200, {"people": people}
+        # Suggestions score up to a hundred names, so they run off the loop
+        loop = asyncio.get_running_loop()
+        suggestions = await loop.run_in_executor(None, graph.suggest_names, name)
+        return 404, {"error": f"person not found: {name}",
+                     "suggestions": [n for n, _ in suggestions]}
+
+    def resolve(self, person):
+        """
+        Returns the IMDb id for an IMDb id or unambiguous name, or None.
+        """
+        if person in self.graph.person_index:
+            return person
+        person_ids = self.graph.ids_for_name(person)
+        return person_ids[0] if len(person_ids) == 1 else None
+
+    async def shortest_path(self, source_id, target_id):
+        """
+        Returns the path between two IMDb ids from the cache, from a
+        search already in progress, or from a new search in the pool.
+        """
+        key = (source_id, target_id)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.counters["cache_hits"] += 1
+            return self.cache[key]
+        if key in self.pending:
+            self.counters["joined"] += 1
+            return await asyncio.shield(self.pending[key])
+
+        self.counters["searches"] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, degrees.shortest_path,
+                                      source_id, target_id)
+        self.pending[key] = future
+        try:
+            path = await asyncio.shield(future)
+        finally:
+            del self.pending[key]
+        self.cache[key] = path
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return path
+
+
+def make_executor(workers, directory, cache):
+    """
+    Returns the executor for searches: one thread, or `workers` forked
+    processes (started now, before the event loop runs).
+    """
+    if workers <= 1:
+        return ThreadPoolExecutor(1)
+    if "fork" in multiprocessing.get_all_start_methods():
+        executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("fork")
+        )
+    else:
+        executor = ProcessPoolExecutor(
+            workers, initializer=init_worker, initargs=(directory, cache)
+        )
+    # Fork the workers now, while this process has no event loop running
+    executor.submit(int).result()
+    return executor
+
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving on http://{host}:{port}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python server.py [directory] [--host H] [--port P] [--workers N]"
+              " [--cache-size N]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="search processes (1: a thread in this process)")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="number of recent answers to keep")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or write the csr snapshot")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, "csr", not args.no_cache)
+    degrees.graph.name_index()
+    executor = make_executor(args.workers, args.directory, not args.no_cache)
+    server = Server(degrees.graph, executor, args.cache_size)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Versioned binary snapshot of a Graph, memory-mapped on load.
+
+The snapshot lives next to the CSV files and records the mtime and size
+of each of them; if any CSV changes, or the format version differs, the
+snapshot is ignored and rebuilt. Loading maps the file and points the
+graph's arrays straight into the mapping, so nothing is parsed or copied
+up front and startup does not depend on the size of the dataset.
+
+Layout (little-endian):
+
+    header    magic, version, section count, source signature
+    sections  (name, typecode, offset, byte length) per section
+    data      each section's raw array, 8-byte aligned
+
+The name index is stored alongside the graph, so name lookups and
+suggestions need no rebuilding either.
+
+A graph that updates.py deltas were applied to is saved separately, as
+degrees.updated.snapshot, and its signature also records a digest of
+those deltas. Plain loads only accept a snapshot of the CSVs as they
+are, so they agree with the dict backend; load_graph(updated=True)
+prefers the updated snapshot while its CSVs are unchanged.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+
+from graph import Graph
+from loader import find
+from nameindex import NameIndex
+
+MAGIC = b"DEGR"
+VERSION = 3
+FILENAME = "degrees.snapshot"
+UPDATED = "degrees.updated.snapshot"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+HEADER = struct.Struct("<4sII")
+SIGNATURE = struct.Struct("<qq")
+SECTION = struct.Struct("<32sc7xqq")
+
+# Graph attributes stored as plain int arrays
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_stars"]
+
+# Graph attributes stored as string tables, with a sorted index for the ids
+STRINGS = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+]
+INDEXES = {"person_index": "person_ids", "movie_index": "movie_ids"}
+
+# NameIndex tables, by kind
+NAME_STRINGS = ["keys", "grams"]
+NAME_ARRAYS = ["key_offsets", "key_people", "gram_offsets", "gram_keys"]
+
+
+class StringTable():
+    """
+    Read-only list of strings stored as one UTF-8 blob plus offsets.
+    Strings are decoded on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedIndex():
+    """
+    Read-only string -> index map over a StringTable, answered by binary
+    search over an array of table positions sorted by string.
+    """
+
+    def __init__(self, table, order):
+        self.table = table
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def get(self, key, default=None):
+        table = self.table
+        order = self.order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if table[order[mid]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and table[order[lo]] == key:
+            return order[lo]
+        return default
+
+    def __getitem__(self, key):
+        index = self.get(key)
+        if index is None:
+            raise KeyError(key)
+        return index
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+def signature(directory, deltas=(0, 0)):
+    """
+    Returns (mtime_ns, size) for each source CSV in `directory`, or for
+    its .gz version if that is the one loaded, followed by the (digest,
+    count) of the deltas applied on top of them.
+    """
+    result = []
+    for name in SOURCES:
+        stat = os.stat(find(directory, name))
+        result.append((stat.st_mtime_ns, stat.st_size))
+    result.append(tuple(deltas))
+    return result
+
+
+def load_graph(directory, stats=None, updated=False):
+    """
+    Returns the Graph for `directory`, memory-mapped from its snapshot
+    when one is current, otherwise built from the CSVs and snapshotted.
+    With `updated`, a current snapshot saved by save_graph after deltas
+    is used first. `stats` only receives load statistics when the CSVs
+    are read.
+    """
+    if updated:
+        graph = read(os.path.join(directory, UPDATED), signature(directory), updated=True)
+        if graph is not None:
+            return graph
+
+    path = os.path.join(directory, FILENAME)
+    graph = read(path, signature(directory))
+    if graph is not None:
+        return graph
+
+    graph = Graph.from_csv(directory, stats)
+    try:
+        write(graph, path, signature(directory))
+    except OSError:
+        # A read-only data directory only costs us the cache
+        pass
+    return graph
+
+
+def save_graph(graph, directory):
+    """
+    Snapshots `graph`, after applying deltas to it, as the updated graph
+    for the CSVs currently in `directory`. load_graph(updated=True) uses
+    it until those CSVs change.
+    """
+    write(graph, os.path.join(directory, UPDATED), signature(directory, graph.deltas))
+
+
+def encode_strings(strings):
+    """
+    Returns (offsets, blob) arrays for a list of strings.
+    """
+    offsets = array("q", [0])
+    parts = []
+    total = 0
+    for s in strings:
+        data = s.encode("utf-8")
+        parts.append(data)
+        total += len(data)
+        offsets.append(total)
+    return offsets, array("B", b"".join(parts))
+
+
+def sections_for(graph):
+    """
+    Returns the (name, array) pairs that make up a snapshot of `graph`.
+    """
+    sections = []
+    for name in ARRAYS:
+        sections.append((name, array("i", getattr(graph, name))))
+    for name in STRINGS:
+        strings = list(getattr(graph, name))
+        offsets, blob = encode_strings(strings)
+        sections.append((f"{name}.off", offsets))
+        sections.append((f"{name}.str", blob))
+        if name in INDEXES.values():
+            # Removed people and movies keep their index with an empty
+            # id, which must not be found by id
+            order = sorted((i for i in range(len(strings)) if strings[i]),
+                           key=strings.__getitem__)
+            sections.append((f"{name}.ord", array("i", order)))
+
+    names = graph.name_index()
+    if names.dirty():
+        # Fold the overlay of an updated graph into fresh tables
+        names = graph.names = NameIndex.build(graph.person_names)
+    for name in NAME_STRINGS:
+        offsets, blob = encode_strings(list(getattr(names, name)))
+        sections.append((f"names.{name}.off", offsets))
+        sections.append((f"names.{name}.str", blob))
+    for name in NAME_ARRAYS:
+        sections.append((f"names.{name}", array("i", getattr(names, name))))
+    return sections
+
+
+def write(graph, path, source_signature):
+    """
+    Writes a snapshot of `graph` to `path`, atomically.
+    """
+    sections = sections_for(graph)
+    offset = HEADER.size + SIGNATURE.size * len(source_signature) + SECTION.size * len(sections)
+    table = []
+    for name, data in sections:
+        offset = align(offset)
+        nbytes = len(data) * data.itemsize
+        table.append((name, data.typecode, offset, nbytes))
+        offset += nbytes
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sections)))
+        for mtime, size in source_signature:
+            f.write(SIGNATURE.pack(mtime, size))
+        for name, typecode, start, nbytes in table:
+            f.write(SECTION.pack(name.encode(), typecode.encode(), start, nbytes))
+        for (name, data), (_, _, start, _) in zip(sections, table):
+            f.write(b"\0" * (start - f.tell()))
+            data.tofile(f)
+    os.replace(tmp, path)
+
+
+def read(path, source_signature, updated=False):
+    """
+    Returns a Graph mapped from the snapshot at `path`, or None if the
+    snapshot is missing, of another version or out of date. With
+    `updated`, the deltas it records need not match those of
+    `source_signature`.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        magic, version, count = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            return None
+        stored = [
+            SIGNATURE.unpack(f.read(SIGNATURE.size)) for _ in source_signature
+        ]
+        expected = [tuple(s) for s in source_signature]
+        if stored[:-1] != expected[:-1] or (not updated and stored[-1] != expected[-1]):
+            return None
+        table = {}
+        for _ in range(count):
+            name, typecode, start, nbytes = SECTION.unpack(f.read(SECTION.size))
+            table[name.rstrip(b"\0").decode()] = (typecode.decode(), start, nbytes)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+
+    def section(name):
+        typecode, start, nbytes = table[name]
+        return view[start:start + nbytes].cast(typecode)
+
+    graph = Graph()
+    graph.deltas = stored[-1]
+    for name in ARRAYS:
+        setattr(graph, name, section(name))
+    for name in STRINGS:
+        setattr(graph, name, StringTable(section(f"{name}.off"), section(f"{name}.str")))
+    for name, ids in INDEXES.items():
+        setattr(graph, name, SortedIndex(getattr(graph, ids), section(f"{ids}.ord")))
+
+    tables = {}
+    for name in NAME_STRINGS:
+        tables[name] = StringTable(section(f"names.{name}.off"),
+                                   section(f"names.{name}.str"))
+    for name in NAME_ARRAYS:
+        tables[name] = section(f"names.{name}")
+    graph.names = NameIndex(**tables)
+    return graph
+
+
+def align(offset):
+    return (offset + 7) & ~7
@@ -0,0 +1,310 @@
+"""
+Incremental updates for the degrees dataset.
+
+A delta is a directory of CSV files in the same format as the dataset:
+
+    people.csv, movies.csv, stars.csv      rows to add (or, for people
+                                           and movies, to update by id)
+    people_removed.csv, movies_removed.csv one id per row
+    stars_removed.csv                      person_id,movie_id rows
+
+Every file is optional and may be gzip-compressed. Applying a delta only
+touches the adjacency rows of the people and movies it names: the csr
+graph's arrays are rebuilt by copying the unchanged runs of rows as
+slices, and the name index takes the changes in its overlay. Removed
+people and movies keep their index, with empty ids and no edges, so no
+other index has to move.
+
+Run as a script, this applies a delta to the csr graph of `directory`
+and saves the result as its updated snapshot, which degrees.py loads
+with --updated (see snapshot.py).
+
+Usage: python updates.py directory delta
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from array import array
+
+from loader import find, read_chunks
+
+# Delta files, each read into the Delta attribute of the same name
+FILES = [
+    "people", "movies", "stars",
+    "people_removed", "movies_removed", "stars_removed",
+]
+
+
+class Delta():
+
+    def __init__(self):
+        # Rows as in the dataset CSVs, without headers
+        self.people = []
+        self.movies = []
+        self.stars = []
+        # Removed person_ids and movie_ids, and removed (person_id, movie_id) rows
+        self.people_removed = []
+        self.movies_removed = []
+        self.stars_removed = []
+
+    @classmethod
+    def from_directory(cls, directory):
+        """
+        Reads the delta files present in `directory`.
+        """
+        delta = cls()
+        for name in FILES:
+            if not os.path.exists(find(directory, f"{name}.csv")):
+                continue
+            rows = getattr(delta, name)
+            for chunk in read_chunks(directory, f"{name}.csv"):
+                if name in ("people_removed", "movies_removed"):
+                    rows.extend(row[0] for row in chunk)
+                else:
+                    rows.extend(chunk)
+        return delta
+
+    def __len__(self):
+        return sum(len(getattr(self, name)) for name in FILES)
+
+    def digest(self, previous=0):
+        """
+        Returns a signed 64-bit hash of the delta's rows, chained onto
+        the digest of the deltas applied before it.
+        """
+        h = hashlib.blake2b(previous.to_bytes(8, "little", signed=True), digest_size=8)
+        for name in FILES:
+            h.update(repr((name, getattr(self, name))).encode())
+        return int.from_bytes(h.digest(), "little", signed=True)
+
+
+def make_mutable(graph):
+    """
+    Replaces the read-only tables of a graph mapped from a snapshot with
+    lists, arrays and dicts, so it can be updated in place.
+    """
+    if isinstance(graph.person_index, dict):
+        return
+    for name in ["person_ids", "person_names", "person_births",
+                 "movie_ids", "movie_titles", "movie_years"]:
+        setattr(graph, name, list(getattr(graph, name)))
+    for name in ["person_offsets", "person_movies", "movie_offsets", "movie_stars"]:
+        setattr(graph, name, array("i", getattr(graph, name)))
+    graph.person_index = {
+        person_id: p for p, person_id in enumerate(graph.person_ids) if person_id
+    }
+    graph.movie_index = {
+        movie_id: m for m, movie_id in enumerate(graph.movie_ids) if movie_id
+    }
+
+
+def apply_to_graph(graph, delta):
+    """
+    Applies `delta` to a csr Graph in place.
+    """
+    make_mutable(graph)
+    names = graph.names
+    person_index = graph.person_index
+    movie_index = graph.movie_index
+
+    # Changed adjacency rows, as insertion-ordered dicts, materialized
+    # from the CSR the first time each row is touched
+    person_rows = {}
+    movie_rows = {}
+
+    def person_row(p):
+        row = person_rows.get(p)
+        if row is None:
+            row = person_rows[p] = dict.fromkeys(edges(graph.person_offsets,
+                                                       graph.person_movies, p))
+        return row
+
+    def movie_row(m):
+        row = movie_rows.get(m)
+        if row is None:
+            row = movie_rows[m] = dict.fromkeys(edges(graph.movie_offsets,
+                                                      graph.movie_stars, m))
+        return row
+
+    for person_id, movie_id in delta.stars_removed:
+        p = person_index.get(person_id)
+        m = movie_index.get(movie_id)
+        if p is not None and m is not None:
+            person_row(p).pop(m, None)
+            movie_row(m).pop(p, None)
+
+    for movie_id in delta.movies_removed:
+        m = movie_index.pop(movie_id, None)
+        if m is None:
+            continue
+        for p in movie_row(m):
+            person_row(p).pop(m, None)
+        movie_row(m).clear()
+        graph.movie_ids[m] = graph.movie_titles[m] = graph.movie_years[m] = ""
+
+    for person_id in delta.people_removed:
+        p = person_index.pop(person_id, None)
+        if p is None:
+            continue
+        for m in person_row(p):
+            movie_row(m).pop(p, None)
+        person_row(p).clear()
+        graph.person_ids[p] = graph.person_names[p] = graph.person_births[p] = ""
+        if names is not None:
+            names.remove(p)
+
+    for person_id, name, birth in delta.people:
+        p = person_index.get(person_id)
+        if p is None:
+            p = graph.add_person(person_id, name, birth)
+        else:
+            graph.person_names[p] = name
+            graph.person_births[p] = birth
+        if names is not None:
+            names.add(p, name)
+
+    for movie_id, title, year in delta.movies:
+        m = movie_index.get(movie_id)
+        if m is None:
+            graph.add_movie(movie_id, title, year)
+        else:
+            graph.movie_titles[m] = title
+            graph.movie_years[m] = year
+
+    for person_id, movie_id in delta.stars:
+        p = person_index.get(person_id)
+        m = movie_index.get(movie_id)
+        if p is not None and m is not None:
+            person_row(p)[m] = None
+            movie_row(m)[p] = None
+
+    graph.person_offsets, graph.person_movies = splice(
+        graph.person_offsets, graph.person_movies, person_rows, graph.num_people()
+    )
+    graph.movie_offsets, graph.movie_stars = splice(
+        graph.movie_offsets, graph.movie_stars, movie_rows, graph.num_movies()
+    )
+    digest, count = graph.deltas
+    graph.deltas = (delta.digest(digest), count + 1)
+
+
+def apply_to_dicts(people, movies, names, delta, name_index=None, name_index_ids=None):
+    """
+    Applies `delta` in place to the `people`, `movies` and `names` maps
+    of degrees.py, and to its NameIndex and the person_ids list that
+    index refers to, if given.
+    """
+    positions = None
+    if name_index is not None and (delta.people or delta.people_removed):
+        positions = {person_id: i for i, person_id in enumerate(name_index_ids)}
+
+    def unname(person_id):
+        key = people[person_id]["name"].lower()
+        names[key].discard(person_id)
+        if not names[key]:
+            del names[key]
+
+    for person_id, movie_id in delta.stars_removed:
+        if person_id in people and movie_id in movies:
+            people[person_id]["movies"].discard(movie_id)
+            movies[movie_id]["stars"].discard(person_id)
+
+    for movie_id in delta.movies_removed:
+        movie = movies.pop(movie_id, None)
+        if movie is not None:
+            for person_id in movie["stars"]:
+                people[person_id]["movies"].discard(movie_id)
+
+    for person_id in delta.people_removed:
+        if person_id not in people:
+            continue
+        for movie_id in people[person_id]["movies"]:
+            movies[movie_id]["stars"].discard(person_id)
+        unname(person_id)
+        del people[person_id]
+        if positions is not None:
+            name_index.remove(positions.pop(person_id))
+
+    for person_id, name, birth in delta.people:
+        if person_id in people:
+            unname(person_id)
+            people[person_id]["name"] = name
+            people[person_id]["birth"] = birth
+        else:
+            people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        names.setdefault(name.lower(), set()).add(person_id)
+        if positions is not None:
+            i = positions.get(person_id)
+            if i is None:
+                i = positions[person_id] = len(name_index_ids)
+                name_index_ids.append(person_id)
+            name_index.add(i, name)
+
+    for movie_id, title, year in delta.movies:
+        if movie_id in movies:
+            movies[movie_id]["title"] = title
+            movies[movie_id]["year"] = year
+        else:
+            movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+    for person_id, movie_id in delta.stars:
+        if person_id in people and movie_id in movies:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+
+
+def edges(offsets, values, r):
+    """
+    Returns the values of CSR row r, or nothing for rows added since the
+    arrays were built.
+    """
+    if r + 1 >= len(offsets):
+        return []
+    return values[offsets[r]:offsets[r + 1]]
+
+
+def splice(offsets, values, rows, size):
+    """
+    Returns (offsets, values) arrays for a CSR with `size` rows, where
+    every row r in `rows` holds the keys of rows[r] and all other rows
+    keep their values. Runs of unchanged rows are copied as slices.
+    """
+    # Rows added since the arrays were built start out empty
+    offsets = array("i", offsets)
+    offsets.extend([offsets[-1]] * (size + 1 - len(offsets)))
+
+    new_offsets = array("i", [0])
+    new_values = array("i")
+    copied = 0
+    for r in sorted(rows) + [size]:
+        if copied < r:
+            shift = len(new_values) - offsets[copied]
+            new_values.extend(values[offsets[copied]:offsets[r]])
+            run = offsets[copied + 1:r + 1]
+            new_offsets.extend(run if not shift else [o + shift for o in run])
+        if r < size:
+            new_values.extend(rows[r])
+            new_offsets.append(len(new_values))
+            copied = r + 1
+    return new_offsets, new_values
+
+
+def main():
+    import degrees
+
+    parser = argparse.ArgumentParser(usage="python updates.py directory delta")
+    parser.add_argument("directory")
+    parser.add_argument("delta", help="directory of delta CSV files")
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory, "csr")
+    delta = Delta.from_directory(args.delta)
+    start = time.perf_counter()
+    degrees.apply_delta(delta, args.directory)
+    print(f"Applied {len(delta)} delta rows in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
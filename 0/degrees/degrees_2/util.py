@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,87 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier backed by a deque, with a set of the states it holds
+    so `contains_state` is O(1). Removed states move to `explored`.
+
+    Callers are expected to check `seen` before adding a state, so each
+    state is in the frontier at most once.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = set()
+        self.explored = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states.add(node.state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def seen(self, state):
+        return state in self.states or state in self.explored
+
+    def empty(self):
+        return not self.frontier
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.states.discard(node.state)
+        self.explored.add(node.state)
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.states.discard(node.state)
+        self.explored.add(node.state)
+        return node
+
+
+class SearchStats():
+    """
+    Counters for shortest path searches. Pass one as `stats` to a search
+    to have it filled in; searches given no stats count nothing.
+
+    A search adds to the counters, so one object can total many queries.
+    Neighbor calls are neighbors_for_person calls for the dict backend
+    and movie casts scanned for the csr graph.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.nodes_expanded = 0
+        self.frontier_peak = 0
+        self.neighbor_calls = 0
+        # Neighbors skipped because they were already reached
+        self.duplicates = 0
+        self.seconds = 0.0
+
+    def frontier(self, size):
+        if size > self.frontier_peak:
+            self.frontier_peak = size
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def report(self):
+        return (f"{self.queries} queries in {self.seconds * 1000:.2f} ms:"
+                f" {self.nodes_expanded} nodes expanded,"
+                f" peak frontier {self.frontier_peak},"
+                f" {self.neighbor_calls} neighbor calls,"
+                f" {self.duplicates} duplicates suppressed")
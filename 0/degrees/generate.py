@@ -0,0 +1,111 @@
+"""
+Synthetic dataset generator for degrees.
+
+Writes people.csv, movies.csv and stars.csv in the format of the CS50
+IMDb extract, with about the requested number of star edges. Cast sizes
+follow a Pareto (power-law) distribution, so most movies have a few
+stars and some have large ensembles, and people are picked with a
+power-law popularity, so a few prolific actors act as hubs. Names are
+drawn from small syllable lists, so some of them are shared, as in the
+real data.
+
+Usage: python generate.py directory [--edges N] [--seed S] [--gzip]
+"""
+
+import argparse
+import csv
+import gzip
+import os
+import random
+
+FIRST = ["Al", "Bea", "Cal", "Dot", "Ed", "Flo", "Gus", "Hal", "Ida", "Jo",
+         "Kit", "Lou", "Max", "Nan", "Os", "Pat", "Ray", "Sue", "Ted", "Viv"]
+SYLLABLES = ["ba", "cor", "den", "fel", "gar", "hol", "kin", "lam", "mor",
+             "nel", "pen", "quist", "ros", "sten", "tor", "val", "win", "zel"]
+WORDS = ["Night", "Last", "Return", "City", "Dream", "Fire", "Secret", "Road",
+         "Summer", "House", "War", "Blue", "Game", "Stranger", "River", "King"]
+
+# Pareto shape and scale of cast sizes, and the largest cast generated
+CAST_ALPHA = 1.8
+CAST_MIN = 2
+CAST_MAX = 300
+
+# Average movies per person, and the skew of who gets cast: person
+# index int(people * random() ** POPULARITY), so low indices are hubs
+CREDITS = 3
+POPULARITY = 3
+
+
+def person_name(rng):
+    syllables = rng.randint(1, 3)
+    last = "".join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+    return f"{rng.choice(FIRST)} {last}"
+
+
+def movie_title(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+
+
+def open_output(directory, name, compress):
+    if compress:
+        return gzip.open(os.path.join(directory, f"{name}.gz"), "wt",
+                         encoding="utf-8", newline="")
+    return open(os.path.join(directory, name), "w", encoding="utf-8", newline="")
+
+
+def generate(directory, edges, seed=None, compress=False):
+    """
+    Writes a dataset with about `edges` star rows to `directory`.
+    Returns (people, movies, edges) counts.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    num_people = max(2, edges // CREDITS)
+
+    with open_output(directory, "people.csv", compress) as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for p in range(num_people):
+            writer.writerow([p + 1, person_name(rng), rng.randint(1900, 2005)])
+
+    num_movies = 0
+    written = 0
+    with open_output(directory, "movies.csv", compress) as movie_file, \
+            open_output(directory, "stars.csv", compress) as star_file:
+        movie_writer = csv.writer(movie_file)
+        star_writer = csv.writer(star_file)
+        movie_writer.writerow(["id", "title", "year"])
+        star_writer.writerow(["person_id", "movie_id"])
+        while written < edges:
+            num_movies += 1
+            movie_writer.writerow([num_movies, movie_title(rng), rng.randint(1920, 2023)])
+            size = min(CAST_MAX, int(CAST_MIN * rng.paretovariate(CAST_ALPHA)),
+                       edges - written)
+            cast = {int(num_people * rng.random() ** POPULARITY) + 1
+                    for _ in range(size)}
+            for person_id in cast:
+                star_writer.writerow([person_id, num_movies])
+            written += len(cast)
+
+    return num_people, num_movies, written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python generate.py directory [--edges N] [--seed S] [--gzip]"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--edges", type=int, default=100000,
+                        help="approximate number of star rows")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--gzip", action="store_true",
+                        help="write .csv.gz files")
+    args = parser.parse_args()
+
+    people, movies, edges = generate(args.directory, args.edges, args.seed, args.gzip)
+    print(f"Wrote {people} people, {movies} movies and {edges} stars"
+          f" to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
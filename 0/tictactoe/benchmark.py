@@ -0,0 +1,215 @@
+"""
+Headless benchmark of the Tic Tac Toe functions and engines.
+
+Three parts, each optional:
+
+    perft     counts the positions reached after each number of moves,
+              through the list-of-lists API (result, terminal, actions),
+              checks them against the known counts and reports
+              positions per second
+    play      plays --games self-play games per engine, the first
+              --random moves of each chosen at random, and reports games
+              and moves per second and the results
+    validate  checks that every engine's move in every reachable
+              position keeps the game value of that position, as
+              search.score computes it, and reports positions per second
+
+Each engine is a name in tictactoe.ENGINES. Results are printed as a
+table and written as JSON lines, one record per measurement. The exit
+status is 1 if a count or a game value is wrong, so the benchmark can
+guard against regressions as well as slowdowns.
+
+Usage: python benchmark.py [--parts NAME ...] [--engines NAME ...]
+                           [--games N] [--random MOVES] [--output file]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import bitboard
+import search
+import tictactoe as ttt
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PARTS = ["perft", "play", "validate"]
+
+# Positions after n moves, counting finished games only where they end
+PERFT = [1, 9, 72, 504, 3024, 15120, 54720, 148176, 200448, 127872]
+
+
+def perft(board, depth):
+    """
+    Returns the number of positions `depth` moves after `board`.
+    """
+    if depth == 0:
+        return 1
+    if ttt.terminal(board):
+        return 0
+    return sum(perft(ttt.result(board, action), depth - 1) for action in ttt.actions(board))
+
+
+def positions():
+    """
+    Returns the (x, o) bitboards of every position reachable from the
+    empty board that is not over.
+    """
+    found = set()
+
+    def visit(x, o):
+        if (x, o) in found or bitboard.terminal(x, o):
+            return
+        found.add((x, o))
+        for cell in bitboard.actions(x, o):
+            visit(*bitboard.result(x, o, cell))
+
+    visit(0, 0)
+    return sorted(found)
+
+
+def run_perft():
+    records = []
+    for depth in range(len(PERFT)):
+        start = time.perf_counter()
+        count = perft(ttt.initial_state(), depth)
+        seconds = time.perf_counter() - start
+        records.append({
+            "part": "perft", "depth": depth, "positions": count, "seconds": seconds,
+            "positions_per_second": count / seconds,
+            "ok": count == PERFT[depth],
+        })
+    return records
+
+
+def play(engine, games, moves, seed):
+    """
+    Plays `games` games of an engine against itself, with `moves` random
+    moves first, and returns its record.
+    """
+    rng = random.Random(seed)
+    results = {ttt.X: 0, ttt.O: 0, None: 0}
+    played = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        board = ttt.initial_state()
+        turn = 0
+        while not ttt.terminal(board):
+            if turn < moves:
+                action = rng.choice(sorted(ttt.actions(board)))
+            else:
+                action = ttt.minimax(board, engine)
+                played += 1
+            board = ttt.result(board, action)
+            turn += 1
+        results[ttt.winner(board)] += 1
+    seconds = time.perf_counter() - start
+    return {
+        "part": "play", "engine": engine, "games": games, "random_moves": moves,
+        "x_wins": results[ttt.X], "o_wins": results[ttt.O], "draws": results[None],
+        "engine_moves": played, "seconds": seconds,
+        "games_per_second": games / seconds,
+        "moves_per_second": played / seconds if played else None,
+        # With perfect play from the empty board, every game is a draw
+        "ok": moves > 0 or results[None] == games,
+    }
+
+
+def validate(engine, cases):
+    """
+    Checks an engine's move in each position against search.score and
+    returns its record.
+    """
+    wrong = []
+    start = time.perf_counter()
+    for x, o in cases:
+        action = ttt.minimax(bitboard.to_board(x, o), engine)
+        if search.score(*bitboard.result(x, o, bitboard.cell(action))) != search.score(x, o):
+            wrong.append(bitboard.to_board(x, o))
+    seconds = time.perf_counter() - start
+    return {
+        "part": "validate", "engine": engine, "positions": len(cases),
+        "wrong": len(wrong), "example": wrong[0] if wrong else None, "seconds": seconds,
+        "positions_per_second": len(cases) / seconds,
+        "ok": not wrong,
+    }
+
+
+def revision():
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                   capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def print_row(record):
+    part = record["part"]
+    status = "ok" if record["ok"] else "WRONG"
+    if part == "perft":
+        name = f"depth {record['depth']}"
+        detail = f"{record['positions']:>7} positions"
+    elif part == "play":
+        name = record["engine"]
+        detail = (f"{record['games']:>7} games, X {record['x_wins']} O {record['o_wins']}"
+                  f" draw {record['draws']}")
+    else:
+        name = record["engine"]
+        detail = f"{record['positions']:>7} positions, {record['wrong']} wrong"
+    print(f"{part:<9} {name:<10} {detail:<36} {record['seconds']:>8.3f}s"
+          f" {record.get('positions_per_second') or record['moves_per_second'] or 0:>11.0f}/s"
+          f"  {status}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [--parts NAME ...] [--engines NAME ...]"
+              " [--games N] [--random MOVES] [--output file]"
+    )
+    parser.add_argument("--parts", nargs="+", choices=PARTS, default=PARTS)
+    parser.add_argument("--engines", nargs="+", choices=list(ttt.ENGINES),
+                        default=list(ttt.ENGINES))
+    parser.add_argument("--games", type=int, default=100,
+                        help="self-play games per engine")
+    parser.add_argument("--random", type=int, default=2,
+                        help="random moves at the start of each game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-",
+                        help="JSON lines results (default: stdout)")
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    common = {"revision": revision(), "python": sys.version.split()[0]}
+    ok = True
+
+    def report(record):
+        nonlocal ok
+        ok = ok and record["ok"]
+        print_row(record)
+        output.write(json.dumps({**record, **common}) + "\n")
+        output.flush()
+
+    try:
+        if "perft" in args.parts:
+            for record in run_perft():
+                report(record)
+        if "play" in args.parts:
+            for engine in args.engines:
+                report(play(engine, args.games, args.random, args.seed))
+        if "validate" in args.parts:
+            cases = positions()
+            for engine in args.engines:
+                report(validate(engine, cases))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Bitboard representation of a Tic Tac Toe board.
+
+A position is two 9-bit integers, one per player, where bit 3 * i + j is
+set if that player holds cell (i, j). Every question about a position is
+then a few integer operations or a lookup in a table indexed by one
+player's bits, precomputed for all 512 of them:
+
+    WINNING[bits]   True if the cells in `bits` contain a winning line
+    THREATS[bits]   the cells that would complete a line for `bits`
+    EMPTY_CELLS[m]  the free cells when the occupied cells are `m`
+
+from_board and to_board convert from and to the list-of-lists boards of
+tictactoe.py, through tables as well, so the list API costs little more
+than its bitboard counterpart. Searches should stay on bitboards.
+"""
+
+# Same marks as tictactoe.py
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# Rows, columns and diagonals as cell masks
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+WINNING = [any(bits & line == line for line in LINES) for bits in range(512)]
+
+# THREATS[bits] = mask of the cells that would complete a line for a
+# player holding `bits`, whether or not they are free
+THREATS = [
+    sum({line & ~bits for line in LINES if (line & ~bits).bit_count() == 1})
+    for bits in range(512)
+]
+
+EMPTY_CELLS = [
+    tuple(cell for cell in range(9) if not occupied >> cell & 1)
+    for occupied in range(512)
+]
+
+# The (i, j) actions of EMPTY_CELLS, for the list-of-lists API
+EMPTY_ACTIONS = [
+    frozenset(divmod(cell, 3) for cell in cells) for cells in EMPTY_CELLS
+]
+
+# ROWS[x][o] = one board row for 3-bit row masks
+ROWS = [
+    [tuple(X if x >> j & 1 else O if o >> j & 1 else EMPTY for j in range(3))
+     for o in range(8)]
+    for x in range(8)
+]
+
+# Flattened list-of-lists board -> (x, o), for every way to fill the cells
+BITBOARDS = {}
+
+
+def fill(cells, x, o, bit):
+    if bit == 1 << 9:
+        BITBOARDS[cells] = (x, o)
+        return
+    fill(cells + (EMPTY,), x, o, bit << 1)
+    fill(cells + (X,), x | bit, o, bit << 1)
+    fill(cells + (O,), x, o | bit, bit << 1)
+
+
+fill((), 0, 0, 1)
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboards of a list-of-lists board.
+    """
+    return BITBOARDS[tuple(board[0] + board[1] + board[2])]
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board of (x, o) bitboards.
+    """
+    return [
+        list(ROWS[x & 0b111][o & 0b111]),
+        list(ROWS[x >> 3 & 0b111][o >> 3 & 0b111]),
+        list(ROWS[x >> 6][o >> 6]),
+    ]
+
+
+def cell(action):
+    """
+    Returns the cell index of an (i, j) action.
+    """
+    return 3 * action[0] + action[1]
+
+
+def action(cell):
+    """
+    Returns the (i, j) action of a cell index.
+    """
+    return divmod(cell, 3)
+
+
+def player(x, o):
+    """
+    Returns the player who moves next.
+    """
+    return X if x.bit_count() == o.bit_count() else O
+
+
+def actions(x, o):
+    """
+    Returns the free cell indices, in increasing order.
+    """
+    return EMPTY_CELLS[x | o]
+
+
+def result(x, o, cell):
+    """
+    Returns the bitboards after the player to move takes `cell`.
+    """
+    if not 0 <= cell < 9 or (x | o) >> cell & 1:
+        raise Exception("not possible")
+    bit = 1 << cell
+    if x.bit_count() == o.bit_count():
+        return x | bit, o
+    return x, o | bit
+
+
+def winner(x, o):
+    """
+    Returns the winner, or None.
+    """
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(x, o):
+    """
+    Returns True if the game is over.
+    """
+    return WINNING[x] or WINNING[o] or x | o == FULL
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won, -1 if O has won, 0 otherwise.
+    """
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    return 0
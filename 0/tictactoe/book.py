@@ -0,0 +1,164 @@
+"""
+Solution table for Tic Tac Toe: the best move in every position.
+
+A position's index is its board read as a base-3 number, with cell
+3 * i + j as digit i * 3 + j and 0, 1, 2 for EMPTY, X, O, so there are
+3 ** 9 = 19683 indices. The table holds one 16-bit entry per index:
+
+    bits 0-3   cell of the best move (as chosen by search.best_move)
+    bits 4-5   value for the player to move: 0 loss, 1 draw, 2 win
+    bits 6-9   moves until the game ends with best play on both sides
+
+Terminal and unreachable positions hold NONE. Running this file solves
+the game and writes the table to book.bin (about 39 KB), which the
+functions below load on first use; without the file, or for positions
+not in it, they fall back to live search.
+
+Usage: python book.py [file]
+"""
+
+import array
+import os
+import sys
+
+import search
+from bitboard import FULL, WINNING
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+MAGIC = b"TTT1"
+
+NONE = 0xFFFF
+
+LOSS, DRAW, WIN = 0, 1, 2
+
+# TERNARY[bits] = the base-3 digits of `bits`' cells set to 1
+TERNARY = [sum(3 ** cell for cell in range(9) if bits >> cell & 1) for bits in range(512)]
+
+# Loaded table, False if it could not be loaded
+TABLE = None
+
+
+def index(x, o):
+    """
+    Returns the table index of a position.
+    """
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+def entry(x, o):
+    """
+    Returns the table entry of a position, solving it.
+    """
+    if WINNING[x] or WINNING[o] or x | o == FULL:
+        return NONE
+    cell = search.best_move(x, o)
+    marks = (x | o).bit_count()
+    if x.bit_count() == o.bit_count():
+        s = search.score(x | 1 << cell, o)
+    else:
+        s = -search.score(x, o | 1 << cell)
+    if s == 0:
+        # A draw ends when the board is full
+        value, moves = DRAW, 9 - marks
+    else:
+        # A win or loss scores 10 minus the marks when it happens
+        value, moves = (WIN if s > 0 else LOSS), 10 - abs(s) - marks
+    return cell | value << 4 | moves << 6
+
+
+def build():
+    """
+    Returns the table, solving every position reachable from the empty
+    board.
+    """
+    table = array.array("H", [NONE]) * 3 ** 9
+    seen = set()
+
+    def visit(x, o):
+        if (x, o) in seen:
+            return
+        seen.add((x, o))
+        table[index(x, o)] = entry(x, o)
+        if WINNING[x] or WINNING[o]:
+            return
+        x_to_move = x.bit_count() == o.bit_count()
+        for cell in range(9):
+            if not (x | o) >> cell & 1:
+                if x_to_move:
+                    visit(x | 1 << cell, o)
+                else:
+                    visit(x, o | 1 << cell)
+
+    visit(0, 0)
+    return table
+
+
+def save(table, path=PATH):
+    """
+    Writes a table to a file, little-endian after a magic header.
+    """
+    if sys.byteorder == "big":
+        table = array.array("H", table)
+        table.byteswap()
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        table.tofile(f)
+
+
+def load(path=PATH):
+    """
+    Returns the table in a file, or None if there is no valid one.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(MAGIC)] != MAGIC or len(data) != len(MAGIC) + 2 * 3 ** 9:
+        return None
+    table = array.array("H")
+    table.frombytes(data[len(MAGIC):])
+    if sys.byteorder == "big":
+        table.byteswap()
+    return table
+
+
+def lookup(x, o):
+    """
+    Returns (cell, value, moves) for a position from the table, or None
+    if it is not in the table or there is no table.
+    """
+    global TABLE
+    if TABLE is None:
+        TABLE = load() or False
+    if not TABLE:
+        return None
+    e = TABLE[index(x, o)]
+    if e == NONE:
+        return None
+    return e & 0b1111, e >> 4 & 0b11, e >> 6
+
+
+def best_move(x, o):
+    """
+    Returns the cell of an optimal move for the player to move, or None
+    if the game is over: from the table if possible, otherwise from
+    search.best_move.
+    """
+    found = lookup(x, o)
+    if found is None:
+        return search.best_move(x, o)
+    return found[0]
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else PATH
+    table = build()
+    save(table, path)
+    positions = sum(1 for e in table if e != NONE)
+    print(f"{positions} positions to move from, {os.path.getsize(path)} bytes in {path}")
+
+
+if __name__ == "__main__":
+    main()
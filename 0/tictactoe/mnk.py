@@ -0,0 +1,424 @@
+"""
+m,n,k-games: Tic Tac Toe on a width x height board, won by k in a row.
+
+Game(3, 3, 3) is the classic game. A Game has the same player, actions,
+result, winner, terminal, utility and minimax functions as tictactoe.py,
+on list-of-lists boards of `height` rows, and runs its searches on
+bitboards: one int per player, where bit i * width + j is cell (i, j).
+
+Every line of k cells is precomputed as a mask, along with the lines
+through each cell, so checking whether a move wins only looks at the
+lines through that move. minimax is a negamax alpha-beta search with a
+transposition table and an optional depth limit. Positions at the limit
+are scored by the game's heuristic, which by default counts open lines
+(lines the opponent has not entered), weighted by how many marks they
+already hold. Any function heuristic(game, own, other) returning a score
+for the player holding `own` can be plugged in instead.
+
+With a time budget, minimax deepens iteratively: it searches 1, 2, 3...
+moves ahead until time runs out, or its `stop` event is set, then
+answers with the best move of the deepest search it completed. Each
+search starts from the previous one's principal variation, through the
+transposition table's best moves and by trying the root moves in the
+order of their previous scores.
+"""
+
+import time
+
+from util import Stats
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Directions of lines: right, down, down-right, down-left
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# Transposition table entries are exact scores or bounds
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Entries kept in a Game's transposition table before it is cleared
+TABLE_LIMIT = 1000000
+
+# Win scores are multiples of this, so heuristic scores (kept below it)
+# never outweigh a win
+WIN_SCALE = 1000000
+
+# Nodes between checks of the deadline and stop event
+CHECK_INTERVAL = 1024
+
+
+class TimeUp(Exception):
+    pass
+
+
+def open_lines(game, own, other):
+    """
+    Heuristic score for the player holding `own`: for every line only
+    one player has entered, 4 ** (their marks in it), counted for that
+    player and against the other.
+    """
+    score = 0
+    for line in game.lines:
+        mine = line & own
+        theirs = line & other
+        if mine and not theirs:
+            score += 4 ** mine.bit_count()
+        elif theirs and not mine:
+            score -= 4 ** theirs.bit_count()
+    return max(-WIN_SCALE + 1, min(WIN_SCALE - 1, score))
+
+
+class Game():
+
+    def __init__(self, width=3, height=3, k=3, heuristic=open_lines):
+        if k > max(width, height):
+            raise ValueError("k must fit on the board")
+        self.width = width
+        self.height = height
+        self.k = k
+        self.size = width * height
+        self.full = (1 << self.size) - 1
+        # A win scores WIN_SCALE * (cells + 1 - marks on the board when
+        # it happens), so faster wins and slower losses are preferred
+        self.win = WIN_SCALE * (self.size + 1)
+        self.heuristic = heuristic
+        # perf_counter() time at which a timed search gives up, or None,
+        # and an event (e.g. threading.Event) that stops it when set
+        self.deadline = None
+        self.stop = None
+
+        self.lines = []
+        for i in range(height):
+            for j in range(width):
+                for di, dj in DIRECTIONS:
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < height and 0 <= end_j < width:
+                        self.lines.append(sum(
+                            1 << self.cell((i + di * n, j + dj * n)) for n in range(k)
+                        ))
+        # Lines through each cell
+        self.lines_through = [
+            [line for line in self.lines if line >> cell & 1] for cell in range(self.size)
+        ]
+        # Cells from the center outwards, the default move order
+        center_i, center_j = (height - 1) / 2, (width - 1) / 2
+        self.order = sorted(
+            range(self.size),
+            key=lambda cell: (max(abs(cell // width - center_i), abs(cell % width - center_j)),
+                              abs(cell // width - center_i) + abs(cell % width - center_j),
+                              cell)
+        )
+
+        # (own << size | other) -> (depth, kind, score, best cell)
+        self.table = {}
+
+    def __repr__(self):
+        return f"Game({self.width}, {self.height}, {self.k})"
+
+    # Conversions
+
+    def cell(self, action):
+        return action[0] * self.width + action[1]
+
+    def action(self, cell):
+        return divmod(cell, self.width)
+
+    def from_board(self, board):
+        """
+        Returns the (x, o) bitboards of a list-of-lists board.
+        """
+        x = o = 0
+        bit = 1
+        for row in board:
+            for square in row:
+                if square == X:
+                    x |= bit
+                elif square == O:
+                    o |= bit
+                bit <<= 1
+        return x, o
+
+    def to_board(self, x, o):
+        """
+        Returns the list-of-lists board of (x, o) bitboards.
+        """
+        return [
+            [X if x >> (i * self.width + j) & 1 else O if o >> (i * self.width + j) & 1
+             else EMPTY for j in range(self.width)]
+            for i in range(self.height)
+        ]
+
+    # The tictactoe.py API, on list-of-lists boards
+
+    def initial_state(self):
+        return [[EMPTY] * self.width for _ in range(self.height)]
+
+    def player(self, board):
+        x, o = self.from_board(board)
+        return X if x.bit_count() == o.bit_count() else O
+
+    def actions(self, board):
+        x, o = self.from_board(board)
+        return {self.action(cell) for cell in self.free_cells(x | o)}
+
+    def result(self, board, action):
+        i, j = action
+        if not (0 <= i < self.height and 0 <= j < self.width):
+            raise Exception("not possible")
+        x, o = self.from_board(board)
+        cell = self.cell(action)
+        if (x | o) >> cell & 1:
+            raise Exception("not possible")
+        if x.bit_count() == o.bit_count():
+            x |= 1 << cell
+        else:
+            o |= 1 << cell
+        return self.to_board(x, o)
+
+    def winner(self, board):
+        x, o = self.from_board(board)
+        if self.has_line(x):
+            return X
+        if self.has_line(o):
+            return O
+        return None
+
+    def terminal(self, board):
+        x, o = self.from_board(board)
+        return self.has_line(x) or self.has_line(o) or x | o == self.full
+
+    def utility(self, board):
+        winner = self.winner(board)
+        return 1 if winner == X else -1 if winner == O else 0
+
+    def minimax(self, board, depth=None, stats=None, budget=None):
+        """
+        Returns the best action for the current player, searching at
+        most `depth` moves ahead (the whole game if None), or None if
+        the game is over. With a `budget` in seconds, the search deepens
+        iteratively and answers within about that time.
+        """
+        x, o = self.from_board(board)
+        if budget is None:
+            cell = self.best_move(x, o, depth, stats)
+        else:
+            cell = self.deepen(x, o, budget, depth, stats)
+        return None if cell is None else self.action(cell)
+
+    # Bitboard helpers
+
+    def free_cells(self, occupied):
+        return [cell for cell in range(self.size) if not occupied >> cell & 1]
+
+    def has_line(self, bits):
+        return any(bits & line == line for line in self.lines)
+
+    def wins(self, bits, cell):
+        """
+        Returns True if `bits`, which include `cell`, hold a line
+        through `cell`.
+        """
+        for line in self.lines_through[cell]:
+            if bits & line == line:
+                return True
+        return False
+
+    def threats(self, own, other):
+        """
+        Returns a mask of the free cells that would complete a line
+        for the player holding `own`.
+        """
+        cells = 0
+        for line in self.lines:
+            if line & other:
+                continue
+            missing = line & ~own
+            if missing and not missing & (missing - 1):
+                cells |= missing
+        return cells
+
+    def ordered_moves(self, own, other, first=None):
+        """
+        Returns the cells to search for the player holding `own`, best
+        first: a winning move alone, else only the cells that block an
+        opponent's win, else `first` (the table's best move) and then
+        the cells from the center outwards.
+        """
+        wins = self.threats(own, other)
+        if wins:
+            return [(wins & -wins).bit_length() - 1]
+        blocks = self.threats(other, own)
+        if blocks:
+            return [cell for cell in range(self.size) if blocks >> cell & 1]
+        occupied = own | other
+        moves = [cell for cell in self.order if not occupied >> cell & 1]
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    # Search
+
+    def best_move(self, x, o, depth=None, stats=None):
+        """
+        Returns the cell of the best move for the player to move, or
+        None if the game is over. Node counts go to `stats` if given.
+        """
+        if self.has_line(x) or self.has_line(o) or x | o == self.full:
+            return None
+        if depth is None:
+            depth = self.size - (x | o).bit_count()
+        if len(self.table) > TABLE_LIMIT:
+            self.table.clear()
+        best, _ = self.search_root(x, o, depth, None, stats or Stats())
+        return best
+
+    def deepen(self, x, o, budget, max_depth=None, stats=None, stop=None):
+        """
+        Returns the cell of the best move found by iterative deepening
+        within `budget` seconds (and `max_depth` moves), or None if the
+        game is over. Setting the `stop` event from another thread ends
+        the search early. The depth completed goes to `stats` if given.
+        """
+        if self.has_line(x) or self.has_line(o) or x | o == self.full:
+            return None
+        if stats is None:
+            stats = Stats()
+        remaining = self.size - (x | o).bit_count()
+        if max_depth is None or max_depth > remaining:
+            max_depth = remaining
+        if len(self.table) > TABLE_LIMIT:
+            self.table.clear()
+
+        best = None
+        scores = None
+        self.deadline = time.perf_counter() + budget
+        self.stop = stop
+        try:
+            for depth in range(1, max_depth + 1):
+                if self.expired():
+                    break
+                best, scores = self.search_root(x, o, depth, scores, stats)
+                stats.depth = depth
+                # A forced win or loss within the depth searched is not
+                # going to change with depth (one found beyond it, through
+                # the table, might still give way to a faster win)
+                score = scores[best]
+                if abs(score) >= WIN_SCALE and self.moves_to_end(score, x, o) <= depth:
+                    break
+        except TimeUp:
+            pass
+        finally:
+            self.deadline = None
+            self.stop = None
+
+        if best is None:
+            # Not even one move ahead in time: take the first candidate
+            own, other = (x, o) if x.bit_count() == o.bit_count() else (o, x)
+            best = self.ordered_moves(own, other)[0]
+        return best
+
+    def expired(self):
+        """
+        Returns True if a timed search has run out of time or been
+        stopped.
+        """
+        if self.stop is not None and self.stop.is_set():
+            return True
+        return time.perf_counter() > self.deadline
+
+    def moves_to_end(self, score, x, o):
+        """
+        Returns the number of moves until the win or loss that `score`
+        stands for, from the position (x, o).
+        """
+        return self.size + 1 - abs(score) // WIN_SCALE - (x | o).bit_count()
+
+    def search_root(self, x, o, depth, previous, stats):
+        """
+        Searches `depth` moves ahead and returns (best cell, {cell:
+        score}). Moves are tried in order of their `previous` scores
+        if given, best first. Scores other than the best may be bounds.
+        """
+        if x.bit_count() == o.bit_count():
+            own, other = x, o
+        else:
+            own, other = o, x
+        marks = (x | o).bit_count()
+        entry = self.table.get(own << self.size | other)
+        first = entry[3] if entry is not None else None
+        moves = self.ordered_moves(own, other, first)
+        if previous is not None:
+            moves.sort(key=lambda cell: -previous.get(cell, -self.win))
+
+        best = None
+        scores = {}
+        alpha, beta = -self.win, self.win
+        for cell in moves:
+            value = self.move_value(own, other, cell, marks, depth, alpha, beta, stats)
+            scores[cell] = value
+            if best is None or value > alpha:
+                alpha, best = value, cell
+        return best, scores
+
+    def move_value(self, own, other, cell, marks, depth, alpha, beta, stats):
+        """
+        Returns the negamax value of playing `cell` for the player
+        holding `own`.
+        """
+        own |= 1 << cell
+        if self.wins(own, cell):
+            stats.nodes += 1
+            return self.win - WIN_SCALE * (marks + 1)
+        return -self.negamax(other, own, marks + 1, depth - 1, -beta, -alpha, stats)
+
+    def negamax(self, own, other, marks, depth, alpha, beta, stats):
+        """
+        Returns the score of a position for the player to move (who
+        holds `own`) if it lies between alpha and beta, otherwise a
+        bound beyond the one it crosses. The position is not won yet.
+        """
+        stats.nodes += 1
+        if self.deadline is not None and stats.nodes % CHECK_INTERVAL == 0:
+            if self.expired():
+                raise TimeUp()
+        if marks == self.size:
+            return 0
+        if depth <= 0:
+            return self.heuristic(self, own, other)
+
+        key = own << self.size | other
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, kind, value, first = entry
+            if entry_depth >= depth:
+                if kind == EXACT:
+                    return value
+                if kind == LOWER and value >= beta:
+                    return value
+                if kind == UPPER and value <= alpha:
+                    return value
+
+        original_alpha = alpha
+        best = -self.win
+        best_cell = None
+        for cell in self.ordered_moves(own, other, first):
+            value = self.move_value(own, other, cell, marks, depth, alpha, beta, stats)
+            if value > best:
+                best, best_cell = value, cell
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            kind = UPPER
+        elif best >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self.table[key] = (depth, kind, best, best_cell)
+        return best
@@ -1,9 +1,21 @@
 import pygame
+import random
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Search engine for the computer's moves (see ttt.ENGINES), or None for
+# the default one for the board's shape
+ENGINE = None
+
+# Seconds the computer appears to think for, at least
+AI_DELAY = 0.5
+
+FPS = 60
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,17 +27,62 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink to fit boards larger than 3x3 in the window
+tile_size = min(80, 240 // max(ttt.WIDTH, ttt.HEIGHT))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The computer searches in a worker thread, so the window keeps drawing
+# and handling events meanwhile; each frame checks whether it is done
+executor = ThreadPoolExecutor(max_workers=1)
+ai_move = None
+ai_started = None
+ai_stop = None
+# Set when the engine failed; the computer then plays random moves for
+# the rest of the game instead of failing again
+ai_failed = False
+clock = pygame.time.Clock()
+
+
+def cancel_ai():
+    """
+    Stops and forgets the computer's search, if it is running.
+    """
+    global ai_move, ai_stop
+    if ai_move is not None:
+        ai_stop.set()
+        ai_move.cancel()
+    ai_move = None
+    ai_stop = None
+
+
+def random_move(board, engine=None, stop=None):
+    """
+    Returns a random legal action, standing in for ttt.minimax.
+    """
+    return random.choice(sorted(ttt.actions(board)))
+
 
 while True:
 
+    # Clicks are taken from events, so one press is one click
+    click = False
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai()
+            executor.shutdown(wait=False)
             sys.exit()
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            click = True
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            # Back to choosing a player
+            cancel_ai()
+            ai_failed = False
+            user = None
+            board = ttt.initial_state()
 
     screen.fill(black)
 
@@ -54,26 +111,22 @@ while True:
         screen.blit(playO, playORect)
 
         # Check if button is clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
+        if click:
             mouse = pygame.mouse.get_pos()
             if playXButton.collidepoint(mouse):
-                time.sleep(0.2)
                 user = ttt.X
             elif playOButton.collidepoint(mouse):
-                time.sleep(0.2)
                 user = ttt.O
 
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (ttt.WIDTH / 2 * tile_size),
+                       height / 2 - (ttt.HEIGHT / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(ttt.HEIGHT):
             row = []
-            for j in range(3):
+            for j in range(ttt.WIDTH):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -101,6 +154,8 @@ while True:
                 title = f"Game Over: {winner} wins."
         elif user == player:
             title = f"Play as {user}"
+        elif ai_failed:
+            title = f"Computer moving at random..."
         else:
             title = f"Computer thinking..."
         title = largeFont.render(title, True, white)
@@ -110,20 +165,30 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if ai_move is None:
+                ai_stop = threading.Event()
+                ai_started = time.perf_counter()
+                search = random_move if ai_failed else ttt.minimax
+                ai_move = executor.submit(search, board, ENGINE, ai_stop)
+            elif ai_move.done() and time.perf_counter() - ai_started >= AI_DELAY:
+                try:
+                    move = ai_move.result()
+                except Exception as error:
+                    # Report it once and play on at random, rather than
+                    # taking the window down or failing every move
+                    print(f"Computer move failed, moving at random: {error!r}",
+                          file=sys.stderr)
+                    ai_failed = True
+                    move = random_move(board)
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+                ai_move = None
+                ai_stop = None
 
         # Check for a user move
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1 and user == player and not game_over:
+        if click and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(ttt.HEIGHT):
+                for j in range(ttt.WIDTH):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -134,13 +199,13 @@ while True:
             againRect.center = againButton.center
             pygame.draw.rect(screen, white, againButton)
             screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
+            if click:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
+                    cancel_ai()
+                    ai_failed = False
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+    clock.tick(FPS)
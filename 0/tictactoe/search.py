@@ -0,0 +1,210 @@
+"""
+Memoized minimax for Tic Tac Toe on bitboards (see bitboard.py).
+
+Positions are scored from X's point of view. A win scores 10 minus the
+number of marks on the board when it happens, so faster wins (and slower
+losses) are preferred, and a draw scores 0. Since a score depends only
+on the position, not on the path to it, every position's score is kept
+in a transposition table for the life of the process: the first search
+from the empty board evaluates each reachable position once, and every
+later search is a walk over dictionary lookups.
+
+Rotations and reflections of a position share its score, so the table
+is keyed on canonical positions (765 reachable ones instead of 5478),
+and moves that a position's own symmetries make equivalent are only
+searched once. Moves are generated on the real board, so best_move's
+cells need no mapping back.
+
+alphabeta_move is a table-free alternative: alpha-beta search with
+move ordering, which counts the nodes it visits. Run this file to
+compare node counts from the empty board.
+"""
+
+from bitboard import FULL, THREATS, WINNING, EMPTY_CELLS
+from symmetry import canonical_key, unique_moves
+from util import Stats
+
+# Canonical position key (see symmetry.py) -> minimax score
+TABLE = {}
+
+
+def score(x, o, stats=None):
+    """
+    Returns the minimax score of a position, from X's point of view.
+    Node counts, table hits included, go to `stats` if given.
+    """
+    if stats is not None:
+        stats.nodes += 1
+    k = canonical_key(x, o)
+    s = TABLE.get(k)
+    if s is not None:
+        return s
+
+    if WINNING[x]:
+        s = 10 - (x | o).bit_count()
+    elif WINNING[o]:
+        s = (x | o).bit_count() - 10
+    elif x | o == FULL:
+        s = 0
+    elif x.bit_count() == o.bit_count():
+        s = max(score(x | 1 << cell, o, stats) for cell in unique_moves(x, o))
+    else:
+        s = min(score(x, o | 1 << cell, stats) for cell in unique_moves(x, o))
+    TABLE[k] = s
+    return s
+
+
+def children(x, o):
+    """
+    Returns (cell, child x, child o) for the moves of the player to move,
+    one per class of moves that are equivalent by symmetry.
+    """
+    if x.bit_count() == o.bit_count():
+        return [(cell, x | 1 << cell, o) for cell in unique_moves(x, o)]
+    return [(cell, x, o | 1 << cell) for cell in unique_moves(x, o)]
+
+
+def best_move(x, o, stats=None):
+    """
+    Returns the cell of an optimal move for the player to move, or None
+    if the game is over. Ties go to the lowest cell among those that
+    are not equivalent by symmetry. Node counts go to `stats` if given.
+    """
+    if WINNING[x] or WINNING[o] or x | o == FULL:
+        return None
+    sign = 1 if x.bit_count() == o.bit_count() else -1
+    best = None
+    best_score = None
+    if stats is not None:
+        stats.nodes += 1
+    for cell, cx, co in children(x, o):
+        s = sign * score(cx, co, stats)
+        if best_score is None or s > best_score:
+            best, best_score = cell, s
+    return best
+
+
+# Static move order: center, corners, edges
+ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+
+def ordered_moves(x, o, killer=None):
+    """
+    Returns the cells to search in a position, best first.
+
+    A winning move is the only one searched, as nothing scores better.
+    Otherwise, if the opponent threatens to win, only the cells that
+    block are searched, as every other move loses at once. Otherwise
+    the killer move (the last move to cause a cutoff at this depth)
+    comes first, then center, corners and edges; cells equivalent by
+    symmetry are searched once.
+    """
+    occupied = x | o
+    free = FULL & ~occupied
+    if x.bit_count() == o.bit_count():
+        own, other = x, o
+    else:
+        own, other = o, x
+
+    wins = THREATS[own] & free
+    if wins:
+        return [(wins & -wins).bit_length() - 1]
+    blocks = THREATS[other] & free
+    if blocks:
+        return list(EMPTY_CELLS[FULL ^ blocks])
+
+    moves = unique_moves(x, o)
+    ordered = [cell for cell in ORDER if cell in moves]
+    if killer is not None and killer in moves:
+        ordered.remove(killer)
+        ordered.insert(0, killer)
+    return ordered
+
+
+def alphabeta(x, o, alpha, beta, killers, stats=None):
+    """
+    Returns the minimax score of a position, from X's point of view,
+    if it lies between alpha and beta, otherwise the bound it crosses.
+    killers[n] holds the killer move for positions with n marks.
+    """
+    if stats is not None:
+        stats.nodes += 1
+    marks = (x | o).bit_count()
+    if WINNING[x]:
+        return 10 - marks
+    if WINNING[o]:
+        return marks - 10
+    if marks == 9:
+        return 0
+
+    x_to_move = x.bit_count() == o.bit_count()
+    for cell in ordered_moves(x, o, killers[marks]):
+        if x_to_move:
+            s = alphabeta(x | 1 << cell, o, alpha, beta, killers, stats)
+            if s > alpha:
+                alpha = s
+        else:
+            s = alphabeta(x, o | 1 << cell, alpha, beta, killers, stats)
+            if s < beta:
+                beta = s
+        if alpha >= beta:
+            killers[marks] = cell
+            break
+    return alpha if x_to_move else beta
+
+
+def alphabeta_move(x, o, stats=None):
+    """
+    Returns the cell of an optimal move found by alpha-beta search, or
+    None if the game is over. Node counts go to `stats` if given.
+    """
+    if WINNING[x] or WINNING[o] or x | o == FULL:
+        return None
+    if stats is not None:
+        stats.nodes += 1
+    killers = [None] * 10
+    sign = 1 if x.bit_count() == o.bit_count() else -1
+    best = None
+    # Scores are within -10..10; a move must beat the best so far
+    alpha, beta = -11, 11
+    for cell in ordered_moves(x, o):
+        if sign == 1:
+            s = alphabeta(x | 1 << cell, o, alpha, beta, killers, stats)
+            if s > alpha:
+                alpha, best = s, cell
+        else:
+            s = alphabeta(x, o | 1 << cell, alpha, beta, killers, stats)
+            if s < beta:
+                beta, best = s, cell
+    return best
+
+
+def tree_size(x, o):
+    """
+    Returns the number of nodes in the full game tree below a position,
+    which is what a search without pruning or a table visits.
+    """
+    if WINNING[x] or WINNING[o] or x | o == FULL:
+        return 1
+    if x.bit_count() == o.bit_count():
+        return 1 + sum(tree_size(x | 1 << cell, o) for cell in EMPTY_CELLS[x | o])
+    return 1 + sum(tree_size(x, o | 1 << cell) for cell in EMPTY_CELLS[x | o])
+
+
+def main():
+    """
+    Prints the nodes each search visits for the first move, and the
+    positions the memoized search keeps.
+    """
+    TABLE.clear()
+    memo = Stats()
+    best_move(0, 0, memo)
+    stats = Stats()
+    alphabeta_move(0, 0, stats)
+    print(f"Full game tree:      {tree_size(0, 0):>7} nodes")
+    print(f"Memoized minimax:    {memo.nodes:>7} nodes, {len(TABLE)} positions in its table")
+    print(f"Alpha-beta, ordered: {stats.nodes:>7} nodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+The 8 symmetries of the Tic Tac Toe board, on bitboards.
+
+Each symmetry is a permutation of the 9 cells: PERMUTATIONS[t][cell] is
+where `cell` goes under symmetry t. MASKS[t][bits] applies it to a
+9-bit mask, by table lookup. A position's canonical key is the smallest
+key (x | o << 9) among its 8 images, so all rotations and reflections of
+a position share one key, and there are about an eighth as many keys as
+positions. Searches still move on the real board, so no move ever has
+to be mapped back from a canonical one.
+"""
+
+from bitboard import EMPTY_CELLS
+
+
+def transform(i, j, t):
+    """
+    Returns where cell (i, j) goes under symmetry t: t & 3 quarter turns
+    clockwise, after a left-right mirror if t & 4.
+    """
+    if t & 4:
+        j = 2 - j
+    for _ in range(t & 3):
+        i, j = j, 2 - i
+    return i, j
+
+
+PERMUTATIONS = [
+    tuple(3 * a + b for a, b in (transform(cell // 3, cell % 3, t) for cell in range(9)))
+    for t in range(8)
+]
+
+MASKS = [
+    [sum(1 << permutation[cell] for cell in range(9) if bits >> cell & 1)
+     for bits in range(512)]
+    for permutation in PERMUTATIONS
+]
+
+
+def canonical_key(x, o):
+    """
+    Returns the canonical key of a position.
+    """
+    return min(masks[x] | masks[o] << 9 for masks in MASKS)
+
+
+def unique_moves(x, o):
+    """
+    Returns the free cells of a position, leaving out cells that a
+    symmetry of the position maps to an earlier one, since they lead
+    to equivalent positions.
+    """
+    cells = EMPTY_CELLS[x | o]
+    symmetries = [t for t in range(1, 8) if MASKS[t][x] == x and MASKS[t][o] == o]
+    if not symmetries:
+        return cells
+    return tuple(
+        cell for cell in cells
+        if all(PERMUTATIONS[t][cell] >= cell for t in symmetries)
+    )
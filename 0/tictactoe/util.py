@@ -0,0 +1,14 @@
+"""
+Helpers shared by the Tic Tac Toe searches.
+"""
+
+
+class Stats():
+    """
+    Node count of a search, and the depth completed by searches that
+    deepen iteratively.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.depth = 0